@@ -0,0 +1 @@
+main();
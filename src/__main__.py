@@ -1,15 +1,19 @@
 #!/usr/bin/python
 
 # Import all of the required libraries.
-import os, sys, glob, platform
-from lexer import Lexer
-from parse import Parser
+import os, sys, glob, time, platform, multiprocessing
+import concurrent.futures
+import cache, manifest, opt, peephole, reach, unit
+from source import load
 
 # Compiler version
 __version__ = "0.1.0"
 
-# Buffer for storing the B program's source code.
-buf = ""
+# Lists of the header files, the B program's source files,
+# and the standard library's source files.
+heads = []
+srcs = []
+libs = []
 
 # Map out the directory of the compiler.
 b_dir = os.path.dirname(os.path.abspath(os.path.dirname(sys.argv[0])))
@@ -41,6 +45,17 @@ options = {
     "oe":    "exe",         # The output file's extension name.
     "S":     False,         # Should the assembly output files be saved?
     "v":     False,         # Display compiler version info?
+    "cache": True,          # Reuse unchanged objects from the cache?
+    "j":     1,             # Number of files to compile at the same time.
+    "O":     1,             # The optimization level.
+    "passes": {},           # Passes turned on or off by -f<pass> and -fno-<pass>.
+    "inline": 16,           # The most instructions a function can have to be inlined.
+    "unroll": 4,            # The number of copies of a loop's body to make when unrolling.
+    "time":  False,         # Show how long each optimization pass takes?
+    "ir":    False,         # Save the intermediate code of each unit?
+    "whole": False,         # Does the unit have every file of the program?
+    "roots": ["_start"],    # The names the program is reached from.
+    "keep":  None,          # The names the unit needs, or None for all of them.
     "files": [],            # The input file name(s).
     "sys":   _sys,          # Operating system
     "cpu":   _cpu,          # CPU machine name
@@ -84,6 +99,57 @@ while a:
         options["v"] = True
         a = a[1:]
 
+    elif a[0] == "--no-cache":
+        options["cache"] = False
+        a = a[1:]
+
+    elif a[0] == "-j":
+        if not a[1].isdigit() or int(a[1]) < 1:
+            print("Unknown number of jobs!")
+            sys.exit(-1)
+        options["j"] = int(a[1])
+        a = a[2:]
+
+    elif a[0] in ("-O0", "-O1", "-O2"):
+        options["O"] = int(a[0][2])
+        a = a[1:]
+
+    elif a[0].startswith("-finline-limit="):
+        if not a[0][15:].isdigit():
+            print("Unknown inline limit!")
+            sys.exit(-1)
+        options["inline"] = int(a[0][15:])
+        a = a[1:]
+
+    elif a[0].startswith("-funroll-factor="):
+        if not a[0][16:].isdigit():
+            print("Unknown unroll factor!")
+            sys.exit(-1)
+        options["unroll"] = int(a[0][16:])
+        a = a[1:]
+
+    elif a[0].startswith("-f") and len(a[0]) > 2:
+
+        # -fno-<pass> turns a pass off and -f<pass> turns it on.
+        name = a[0][5:] if a[0].startswith("-fno-") else a[0][2:]
+        if name not in [i[0] for i in opt.PASSES] + ["dfe", "peephole"] + ["peephole-"+i for i in peephole.RULES]:
+            print("Unknown pass '{}'!".format(name))
+            sys.exit(-1)
+        options["passes"][name] = not a[0].startswith("-fno-")
+        a = a[1:]
+
+    elif a[0] == "--time-passes":
+        options["time"] = True
+        a = a[1:]
+
+    elif a[0] == "--dump-ir":
+        options["ir"] = True
+        a = a[1:]
+
+    elif a[0] == "--keep":
+        options["roots"].append(a[1])
+        a = a[2:]
+
     else:
         options["files"].append(a[0])
         a = a[1:]
@@ -102,98 +168,197 @@ if not options["files"]:
     print("No input file specified!")
     sys.exit(-100)
 
-# Add each system library header file to the buffer.
-for i in [f for f in glob.glob(sys_h_glob)]:
-    try:
-        with open(i, "r") as f:
-            buf += f.read()
-
-    except:
-        print("Could not open library header file '{}'!".format(i))
-        sys.exit(-1)
-
-# Add each library header file to the buffer.
-for i in [f for f in glob.glob(lib_h_glob)]:
-    try:
-        with open(i, "r") as f:
-            buf += f.read()
-
-    except:
-        print("Could not open library header file '{}'!".format(i))
-        sys.exit(-1)
-
-# Add each file to the buffer.
-for i in options["files"]:
-
-    try:
-        with open(i, "r") as f:
-            buf += f.read()
-
-    except:
-        print("Could not open input file '{}'!".format(i))
-        sys.exit(-1)
-
-# Add each system library file to the buffer.
-for i in [f for f in glob.glob(sys_glob)]:
-    try:
-        with open(i, "r") as f:
-            buf += f.read()
-
-    except:
-        print("Could not open library file '{}'!".format(i))
-        sys.exit(-1)
-
-# Add each library file to the buffer.
-for i in [f for f in glob.glob(lib_glob)]:
-    try:
-        with open(i, "r") as f:
-            buf += f.read()
-
-    except:
-        print("Could not open library file '{}'!".format(i))
-        sys.exit(-1)
-
-# Compile the source code into assemble.
-b, c = Lexer(buf, options).lexer()
-d = Parser(b, c, options).parser()
-
-# Write the assembly code into the out file. 
-with open("{0[ob]}.asm".format(options), "w") as f:
-    for i in d:
-        f.write(i)
-        f.write("\n")
-
-# Assemble the assembly output and link the object file into an executable
-# based on the output format.
-
-# win32
-if options["f"] == "win32":
-    os.system("nasm -fwin32 -o{0[ob]}.obj {0[ob]}.asm".format(options))
-    os.system("link /entry:_start /subsystem:console /machine:x86 /defaultlib:kernel32.lib {0[ob]}.obj".format(options))
-    os.remove("{0[ob]}.obj".format(options))
-
-# win64
-elif options["f"] == "win64":
-    os.system("nasm -fwin64 -o{0[ob]}.obj {0[ob]}.asm".format(options))
-    os.system("link /entry:_start /subsystem:console /machine:x64 /defaultlib:kernel32.lib {0[ob]}.obj".format(options))
-    os.remove("{0[ob]}.obj".format(options))
-
-# lin32
-elif options["f"] == "lin32":
-    os.system("nasm -felf32 -o{0[ob]}.o {0[ob]}.asm".format(options))
-    os.system("ld -o{0[ob]} -e__start -melf_i386 {0[ob]}.o".format(options))
-    os.remove("{0[ob]}.o".format(options))
-
-# lin64
-elif options["f"] == "lin64":
-    os.system("nasm -felf64 -o{0[ob]}.o {0[ob]}.asm".format(options))
-    os.system("ld -o{0[ob]} -e__start -melf_x86_64 {0[ob]}.o".format(options))
-    os.remove("{0[ob]}.o".format(options))
+# Read every source file. The headers are compiled with both the program
+# and the library so that the prototypes are known before they're used.
+for l, paths, what in ((heads, glob.glob(sys_h_glob), "library header file"),
+                       (heads, glob.glob(lib_h_glob), "library header file"),
+                       (srcs, options["files"], "input file"),
+                       (libs, glob.glob(sys_glob), "library file"),
+                       (libs, glob.glob(lib_glob), "library file")):
+    for i in paths:
+        try:
+            l.append(load(i))
+
+        except:
+            print("Could not open {} '{}'!".format(what, i))
+            sys.exit(-1)
+
+# The assembler's format, the object file's extension, the linker
+# command and the executable's name for each output format.
+formats = {
+    "win32": ("win32", "obj", "link /entry:_start /subsystem:console /machine:x86 /defaultlib:kernel32.lib /out:{ob}.exe {objs}", "{ob}.exe"),
+    "win64": ("win64", "obj", "link /entry:_start /subsystem:console /machine:x64 /defaultlib:kernel32.lib /out:{ob}.exe {objs}", "{ob}.exe"),
+    "lin32": ("elf32", "o", "ld -o{ob} -e__start -melf_i386 {objs}", "{ob}"),
+    "lin64": ("elf64", "o", "ld -o{ob} -e__start -melf_x86_64 {objs}", "{ob}")
+    }
 
-else:
+if options["f"] not in formats:
     print("Failed to build specified output format!")
     sys.exit(-100)
 
+options["asm"], options["obj"], link, exe = formats[options["f"]]
+exe = exe.format(ob=options["ob"])
+
+last = manifest.load(options["ob"])
+
+# Find the functions and global variables that can be reached from _start
+# and the names given with --keep. Each unit only compiles the ones it
+# defines or refers to. This is worked out again only when a file or an
+# option has changed since the last build, and then only the files that
+# have changed are parsed again.
+reached = None
+
+if opt.enabled(options, "dfe", 1):
+    k = cache.key([i.name for i in heads+srcs+libs], options, __version__)
+
+    # What each file refers to is kept under the file's name in the key,
+    # so the same file given by another path still finds it. It's worked
+    # out again if any file is missing.
+    if options["cache"] and last.get("reach", {}).get("key") == k and all(cache.name(i.name) in last["reach"]["names"] for i in srcs+libs):
+        reached = last["reach"]
+    else:
+        files = {}
+
+        for i in srcs+libs:
+
+            # What a file defines and refers to only depends on it and the
+            # headers, so it is only scanned again when one of them changes.
+            # The lexer and the parser don't use any option, so the options
+            # aren't part of the key.
+            fk = cache.key([h.name for h in heads]+[i.name], {"scan": True}, __version__)
+            files[i.name] = cache.load(fk) if options["cache"] else None
+
+            if files[i.name] is None:
+                defs, names, edges, roots = reach.scan(heads, i, options)
+                files[i.name] = [sorted(defs), sorted(names), {n: sorted(e) for n, e in edges.items()}, sorted(roots)]
+
+                if options["cache"]:
+                    cache.save(fk, files[i.name])
+
+        reached = {"key": k,
+                   "live": sorted(reach.live(files.values(), options["roots"])),
+                   "defs": sorted(n for i in files.values() for n in i[0]),
+                   "names": {}}
+
+        # Two files with the same name in the key share the names they
+        # refer to.
+        for n, i in files.items():
+            reached["names"][cache.name(n)] = sorted(set(reached["names"].get(cache.name(n), [])) | set(i[1]))
+
+    if options["v"]:
+        dropped = set(reached["defs"]) - set(reached["live"])
+        print("Dropped {} of {} functions and globals that can't be reached from {}.\n".format(len(dropped), len(reached["defs"]), ", ".join(options["roots"])))
+
+# Make a list of the units to compile. Each unit is a list of source files,
+# the base name of its output files, its cache key and its options. A
+# unit's object file can be reused from the cache when none of its files,
+# the headers, the options or the compiler have changed.
+units = []
+
+def add_unit(files, name):
+
+    # Only a unit with every file of the program knows every change that
+    # can be made to its global variables. The library's globals can be
+    # changed by the program.
+    o = dict(options, whole=files == srcs)
+
+    if reached is not None:
+        live = set(reached["live"])
+        o["keep"] = sorted({n for i in files for n in reached["names"][cache.name(i.name)] if n in live})
+
+    units.append((files, name, cache.key([h.name for h in heads+files], o, __version__), o))
+
+if options["j"] > 1:
+
+    # Each file is compiled on its own, so they can all be compiled at once.
+    # The prototypes in the headers are shared by every file.
+    for n, i in enumerate(srcs):
+        add_unit([i], "{}_{}".format(options["ob"], n))
+
+    for n, i in enumerate(libs):
+        add_unit([i], "{}_lib{}".format(options["ob"], n))
+
+else:
+    add_unit(srcs, options["ob"])
+    add_unit(libs, "{}_lib".format(options["ob"]))
+
+# Nothing needs to be done if every unit is the same as in the last build
+# and the executable hasn't been touched since then.
+keys = {name: k for files, name, k, o in units}
+
+# The assembly, the intermediate code and the pass times are only made
+# when a unit is compiled, so none is reused when they're asked for.
+reuse = options["cache"] and not (options["S"] or options["ir"] or options["time"])
+
+if reuse and last.get("units") == keys and last.get("exe") == manifest.stamp(exe) and last.get("exe"):
+    if options["v"]:
+        print("'{}' is up to date.".format(exe))
+    sys.exit(0)
+
+# Find the units that need to be compiled.
+todo = []
+for files, name, k, o in units:
+    if reuse and cache.get(k, "{}.{}".format(name, options["obj"])):
+        if options["v"]:
+            print("Using the cached {} for {}.".format(k[:12], ", ".join(os.path.basename(i.name) for i in files)))
+    else:
+        todo.append((files, name, k, o))
+
+# Compile and assemble each unit.
+start = time.perf_counter()
+
+if options["j"] > 1 and len(todo) > 1:
+
+    # The workers are forked so that they don't run the driver again.
+    # Without fork, the units are compiled one at a time.
+    if "fork" in multiprocessing.get_all_start_methods():
+        with concurrent.futures.ProcessPoolExecutor(options["j"], multiprocessing.get_context("fork")) as pool:
+            list(pool.map(unit.compile,
+                          [heads+i[0] for i in todo],
+                          [i[1] for i in todo],
+                          [i[3] for i in todo]))
+    else:
+        for files, name, k, o in todo:
+            unit.compile(heads+files, name, o)
+
+else:
+    for files, name, k, o in todo:
+        unit.compile(heads+files, name, o)
+
+built = time.perf_counter() - start
+
+# Save the newly compiled objects in the cache.
+for files, name, k, o in todo:
+    if options["cache"] and os.path.exists("{}.{}".format(name, options["obj"])):
+        cache.put(k, "{}.{}".format(name, options["obj"]))
+
+# Link the object files into an executable.
+objs = ["{}.{}".format(i[1], options["obj"]) for i in units]
+start = time.perf_counter()
+os.system(link.format(ob=options["ob"], objs=" ".join(objs)))
+linked = time.perf_counter() - start
+
+# Show how big the objects and the executable are and how long they took
+# to make, so builds with and without -fno-dfe can be compared.
+if options["v"]:
+    print()
+    for i in objs + [exe]:
+        if os.path.exists(i):
+            print("{}: {} bytes".format(i, os.path.getsize(i)))
+    print("Compiled and assembled {} of {} units in {:.2f} s, linked in {:.2f} s.".format(len(todo), len(units), built, linked))
+
+# Remember what went into the executable for the next build.
+manifest.save(options["ob"], {"version": __version__,
+                              "units": keys,
+                              "reach": reached,
+                              "exe": manifest.stamp(exe)})
+
 # Clean up the mess that was made!
+for i in objs:
+    if os.path.exists(i):
+        os.remove(i)
+
 if not options["S"]:
-    os.remove("{0[ob]}.asm".format(options))
+    for files, name, k, o in todo:
+        if os.path.exists("{}.asm".format(name)):
+            os.remove("{}.asm".format(name))
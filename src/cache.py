@@ -0,0 +1,142 @@
+"""B Compiler object cache."""
+
+import os, glob, json, hashlib, shutil
+
+# The most bytes the cache can hold before the oldest entries are removed.
+LIMIT = 64*1024*1024
+
+# The options that don't change the object file that is made.
+IGNORE = ("o", "ob", "oe", "S", "v", "cache", "j", "time", "ir", "files")
+
+# The hash of the compiler's own code, once it's been worked out.
+_compiler = None
+
+# Gets the directory of the cache.
+def path():
+    if os.environ.get("B_CACHE"):
+        return os.environ["B_CACHE"]
+    return os.path.join(os.path.expanduser("~"), ".cache", "b")
+
+# Hashes the compiler's code, so objects made by another build of the
+# compiler with the same version are never used.
+def compiler():
+    global _compiler
+
+    if _compiler is None:
+        h = hashlib.sha256()
+
+        for i in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+            with open(i, "rb") as f:
+                h.update(f.read())
+
+        _compiler = h.hexdigest()
+
+    return _compiler
+
+# The name a file goes by in a key: its directory's name and its own, so
+# the key doesn't depend on where the compiler or the program is.
+def name(path):
+    return os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+
+# Creates the cache key from the source files, the options and the
+# compiler version.
+def key(files, options, version):
+    h = hashlib.sha256()
+    h.update("{}\0{}\0".format(version, compiler()).encode())
+
+    for k in sorted(options):
+        if k not in IGNORE:
+            h.update("{}={!r}\0".format(k, options[k]).encode())
+
+    for i in sorted(files):
+        h.update("{}\0".format(name(i)).encode())
+
+        with open(i, "rb") as f:
+            h.update(f.read())
+        h.update(b"\0")
+
+    return h.hexdigest()
+
+# Copies a cached file to dest. Returns False if it isn't cached.
+def get(k, dest):
+    p = os.path.join(path(), k)
+
+    try:
+        shutil.copyfile(p, dest)
+
+        # Mark the entry as recently used.
+        os.utime(p)
+    except OSError:
+        return False
+
+    return True
+
+# Adds a file to the cache.
+def put(k, src):
+    p = os.path.join(path(), k)
+
+    try:
+        os.makedirs(path(), exist_ok=True)
+
+        # Copy and then rename so that other compilers never see half a file.
+        shutil.copyfile(src, p + ".tmp")
+        os.replace(p + ".tmp", p)
+    except OSError:
+        return
+
+    evict()
+
+# Gets the data saved under a key with save(). Returns None if it isn't
+# cached.
+def load(k):
+    p = os.path.join(path(), k)
+
+    try:
+        with open(p) as f:
+            data = json.load(f)
+
+        # Mark the entry as recently used.
+        os.utime(p)
+    except (OSError, ValueError):
+        return None
+
+    return data
+
+# Saves data that can be written as JSON in the cache.
+def save(k, data):
+    p = os.path.join(path(), k)
+
+    try:
+        os.makedirs(path(), exist_ok=True)
+
+        # Write and then rename so that other compilers never see half a file.
+        with open(p + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(p + ".tmp", p)
+    except OSError:
+        return
+
+    evict()
+
+# Removes the least recently used entries until the cache fits in the limit.
+def evict(limit=None):
+    if limit is None:
+        limit = int(os.environ.get("B_CACHE_SIZE", LIMIT))
+
+    entries = []
+    for i in os.scandir(path()):
+        if i.is_file():
+            s = i.stat()
+            entries.append((s.st_mtime, s.st_size, i.path))
+
+    total = sum(i[1] for i in entries)
+
+    for t, size, p in sorted(entries):
+        if total <= limit:
+            break
+
+        try:
+            os.remove(p)
+            total -= size
+        except OSError:
+            pass
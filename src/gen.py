@@ -0,0 +1,433 @@
+"""B Compiler intermediate code generator."""
+
+import sys
+
+from tokens import *
+from tree import Func
+from ir import *
+
+# The instruction for each binary operator.
+_binary = {"+": "add",
+           "-": "sub",
+           "*": "mul",
+           "/": "div",
+           "%": "mod",
+           "<<": "shl",
+           ">>": "shr",
+           "&": "and",
+           "|": "or",
+           "^": "xor",
+           "<": "lt",
+           ">": "gt",
+           "<=": "le",
+           ">=": "ge",
+           "==": "eq",
+           "!=": "ne"}
+
+class Gen():
+
+    def __init__(self, prog, options):
+
+        # The syntax tree of the whole program.
+        self.prog = prog
+
+        # Save the compiler options and flags.
+        self.options = options
+
+        # Size of a word on the machine in 8-bit bytes.
+        self.word = 8 if options["f"] in ("win64", "lin64") else 4
+
+        # The intermediate code of the whole program.
+        self.module = Module(prog.funcs)
+
+        # The function and the block code is being added to.
+        self.fn = None
+        self.cur = None
+
+        # The blocks to go to for a next and a break in each loop the
+        # current statement is in.
+        self.loops = []
+
+        # The variables the current function can see, by name.
+        self.scope = {}
+
+    # Handles code generator errors. The error points at the token t.
+    def error(self, err=0, t=None):
+        if t is None:
+            print("Code Generator Error #{}\n{}\n".format(int(err), err))
+            sys.exit(int(err))
+
+        print(t.text().replace("\t", " "))
+        print((t.char-1)*" "+"^")
+        print("Code Generator Error #{} at {}\n{}\n".format(int(err), t.pos(), err))
+        sys.exit(int(err))
+
+    # Adds an instruction to the current block.
+    def add(self, op, dst=None, args=(), targets=()):
+
+        # Code after a jump can't be reached, but it still needs a block.
+        if self.cur.insts and self.cur.insts[-1].op in TERMINATORS:
+            self.start(Block())
+
+        self.cur.insts.append(Inst(op, dst, args, targets))
+
+    # Starts adding code to a new block.
+    def start(self, b):
+        self.fn.place(b)
+        self.cur = b
+
+    # Goes to a block, unless the current block already jumped away.
+    def goto(self, b):
+        if not (self.cur.insts and self.cur.insts[-1].op in TERMINATORS):
+            self.add("jmp", targets=[b])
+
+    # Generates the intermediate code of the whole program.
+    def gen(self):
+        for i in self.prog.items:
+            if isinstance(i, Func):
+                self.func(i)
+            elif i.op in ("global", "vector"):
+                self.module.data.append(i)
+            else:
+                self.module.text.append(i.data)
+
+        return self.module
+
+    def func(self, f):
+        self.fn = Function(f.name, f.call, [])
+        self.scope = {}
+
+        for i in f.params:
+            v = Var(i, "param")
+            self.fn.params.append(v)
+            self.fn.vars[i] = v
+            self.scope[i] = v
+
+        self.start(Block())
+        self.statement(f.body)
+
+        # Return 0 if the end of the function is reached.
+        if not (self.cur.insts and self.cur.insts[-1].op in TERMINATORS):
+            self.add("ret", args=[Const(0)])
+
+        self.module.text.append(self.fn)
+
+    def statement(self, n):
+        op = n.op
+
+        if op == "block":
+            for i in n.kids:
+                self.statement(i)
+        elif op == "auto":
+            self.do_auto(n)
+        elif op == "extrn":
+            self.do_extrn(n)
+        elif op == "asm":
+            self.fn.asm = True
+            self.add("asm", args=[n.data])
+        elif op == "return":
+            self.add("ret", args=[self.expr(n.kids[0])] if n.kids else [Const(0)])
+        elif op == "break":
+            self.add("jmp", targets=[self.loops[-1][1]])
+        elif op == "next":
+            self.add("jmp", targets=[self.loops[-1][0]])
+        elif op == "if":
+            self.do_if(n)
+        elif op == "while":
+            self.do_while(n)
+        elif op == "repeat":
+            self.do_repeat(n)
+        elif op == "expr":
+
+            # The value of an expression statement isn't used.
+            self.expr(n.kids[0], False)
+        else:
+            self.error(100, n.tok)
+
+    def do_extrn(self, n):
+        for i in n.kids:
+            v = Var(i.data, "extrn")
+            self.fn.vars[i.data] = v
+            self.scope[i.data] = v
+
+            if i.data not in self.module.used:
+                self.module.used.append(i.data)
+
+    def do_auto(self, n):
+        for i in n.kids:
+            if i.op == "vector":
+                v = Var(i.data, "auto", int(i.kids[0].data))
+            else:
+                v = Var(i.data, "auto")
+
+            self.fn.vars[i.data] = v
+            self.scope[i.data] = v
+
+    def do_repeat(self, n):
+        body = Block()
+        end = Block()
+
+        self.goto(body)
+        self.start(body)
+
+        self.loops.append((body, end))
+        self.statement(n.kids[0])
+        self.loops.pop()
+
+        self.goto(body)
+        self.start(end)
+
+    def do_while(self, n):
+        test = Block()
+        body = Block()
+        end = Block()
+
+        self.goto(test)
+        self.start(test)
+
+        # Skip loop if the expression is false.
+        self.add("br", args=[self.expr(n.kids[0])], targets=[body, end])
+
+        self.start(body)
+        self.loops.append((test, end))
+        self.statement(n.kids[1])
+        self.loops.pop()
+
+        self.goto(test)
+        self.start(end)
+
+    def do_if(self, n):
+        body = Block()
+        end = Block()
+
+        # With an else, a false test goes to the else instead of the end.
+        other = Block() if len(n.kids) > 2 else end
+
+        self.add("br", args=[self.expr(n.kids[0])], targets=[body, other])
+
+        self.start(body)
+        self.statement(n.kids[1])
+
+        if len(n.kids) > 2:
+            self.goto(end)
+            self.start(other)
+            self.statement(n.kids[2])
+
+        self.goto(end)
+        self.start(end)
+
+    # Generates the code for an expression. Returns the operand that holds
+    # its value. If the value isn't used, the work to keep it is skipped.
+    def expr(self, n, used=True):
+        op = n.op
+
+        if op == "name":
+            if n.data in self.scope:
+                return self.scope[n.data]
+
+            # Functions can be used as their address.
+            elif n.data in self.prog.funcs:
+                return Sym(n.data)
+
+            self.error(10, n.tok)
+
+        elif op == "number":
+            return Const(int(n.data))
+
+        elif op == "string":
+            t = self.fn.temp()
+            self.add("str", t, [n.data])
+            return t
+
+        elif op in _binary:
+            a = self.expr(n.kids[0])
+            b = self.expr(n.kids[1])
+            t = self.fn.temp()
+            self.add(_binary[op], t, [a, b])
+            return t
+
+        elif op == "=":
+            return self.assign(n)
+
+        elif op in ("+=", "-=", "*=", "/=", "%=", "<<=", ">>=", "&=", "^=", "|="):
+            return self.update(n.kids[0], _binary[op[:-1]], n.kids[1])
+
+        elif op == "?":
+            return self.select(n)
+
+        elif op == "call":
+            return self.call(n)
+
+        # a[b] and *a
+        elif op in ("[]", "u*"):
+            t = self.fn.temp()
+            self.add("load", t, self.place(n))
+            return t
+
+        # &a
+        elif op == "u&":
+            return self.address(n.kids[0])
+
+        # +a
+        elif op == "u+":
+            return self.expr(n.kids[0], used)
+
+        # -a and !a
+        elif op in ("u-", "u!"):
+            t = self.fn.temp()
+            self.add("neg" if op == "u-" else "not", t, [self.expr(n.kids[0])])
+            return t
+
+        # ++a and --a
+        elif op in ("u++", "u--"):
+            return self.update(n.kids[0], "add" if op == "u++" else "sub", Const(1))
+
+        # a++ and a--
+        elif op in ("++", "--"):
+            a = n.kids[0]
+            op = "add" if op == "++" else "sub"
+
+            if a.op == "name":
+                v = self.lvalue(a)
+
+                # Save the value from before the change.
+                t = None
+                if used:
+                    t = self.fn.temp()
+                    self.add("mov", t, [v])
+
+                self.add(op, v, [v, Const(1)])
+                return t
+
+            p = self.place(a)
+            t = self.fn.temp()
+            self.add("load", t, p)
+            u = self.fn.temp()
+            self.add(op, u, [t, Const(1)])
+            self.add("store", args=p[:1] + [u] + p[1:])
+            return t
+
+        else:
+            # This shouldn't be possible, but just in case.
+            self.error(600, n.tok)
+
+    # Gets the variable a name assigns to.
+    def lvalue(self, n):
+        if n.data in self.scope:
+            return self.scope[n.data]
+        self.error(10, n.tok)
+
+    # Works out the address of something that can be assigned to.
+    def address(self, n):
+        if n.op == "name":
+            v = self.lvalue(n)
+            v.addressed = True
+
+            t = self.fn.temp()
+            self.add("addr", t, [v])
+            return t
+
+        elif n.op == "u*":
+            return self.expr(n.kids[0])
+
+        elif n.op == "[]":
+
+            # The address is a + b words.
+            a = self.expr(n.kids[0])
+            b = self.expr(n.kids[1])
+
+            t = self.fn.temp()
+            self.add("shl", t, [b, Const(self.word.bit_length()-1)])
+            u = self.fn.temp()
+            self.add("add", u, [a, t])
+            return u
+
+        self.error(62, n.tok)
+
+    # Works out where the word something that can be assigned to is, as
+    # the operands of a load or a store. a[b] is a and the number of words
+    # b, so the machine can scale b itself.
+    def place(self, n):
+        if n.op == "[]":
+            return [self.expr(n.kids[0]), self.expr(n.kids[1])]
+        return [self.address(n)]
+
+    # a = b
+    def assign(self, n):
+        a, b = n.kids
+
+        if a.op == "name":
+            v = self.lvalue(a)
+            b = self.expr(b)
+            self.add("mov", v, [b])
+            return b if isinstance(b, Const) else v
+
+        # Work out b before the address, unless it's just a variable or
+        # a number.
+        if b.leaf():
+            p = self.place(a)
+            b = self.expr(b)
+        else:
+            b = self.expr(b)
+            p = self.place(a)
+
+        self.add("store", args=p[:1] + [b] + p[1:])
+        return b
+
+    # a op= b. b can also be a number.
+    def update(self, a, op, b):
+        if a.op == "name":
+            v = self.lvalue(a)
+            b = b if isinstance(b, Const) else self.expr(b)
+            self.add(op, v, [v, b])
+            return v
+
+        # Work out b before the address, unless it's just a variable or
+        # a number.
+        first = not isinstance(b, Const) and not b.leaf()
+        if first:
+            b = self.expr(b)
+
+        p = self.place(a)
+        t = self.fn.temp()
+        self.add("load", t, p)
+        if not first and not isinstance(b, Const):
+            b = self.expr(b)
+        u = self.fn.temp()
+        self.add(op, u, [t, b])
+        self.add("store", args=p[:1] + [u] + p[1:])
+        return u
+
+    # a ? b : c
+    def select(self, n):
+        t = self.fn.temp()
+        yes = Block()
+        no = Block()
+        end = Block()
+
+        self.add("br", args=[self.expr(n.kids[0])], targets=[yes, no])
+
+        self.start(yes)
+        self.add("mov", t, [self.expr(n.kids[1])])
+        self.goto(end)
+
+        self.start(no)
+        self.add("mov", t, [self.expr(n.kids[2])])
+        self.goto(end)
+
+        self.start(end)
+        return t
+
+    # f(a, b, ...)
+    def call(self, n):
+        f = n.kids[0]
+
+        # Make sure this function exists!
+        if f.op != "name" or f.data not in self.prog.funcs:
+            self.error(701, f.tok)
+
+        args = [self.expr(i) for i in n.kids[1:]]
+
+        t = self.fn.temp()
+        self.add("call", t, [Sym(f.data)] + args)
+        return t
@@ -0,0 +1,242 @@
+"""B Compiler intermediate representation."""
+
+# A virtual register. Each one is only used inside of one function.
+class Temp():
+
+    __slots__ = ("n",)
+
+    def __init__(self, n):
+        self.n = n
+
+    def __eq__(self, other):
+        return isinstance(other, Temp) and self.n == other.n
+
+    def __hash__(self):
+        return hash(self.n)
+
+    def __repr__(self):
+        return "t{}".format(self.n)
+
+# A number.
+class Const():
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Const) and self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __repr__(self):
+        return "{}".format(self.value)
+
+# A variable. Autos and parameters are kept in the function's frame and
+# extrns are global. A vector auto has a size and is a pointer to its words.
+class Var():
+
+    __slots__ = ("name", "kind", "size", "addressed")
+
+    def __init__(self, name, kind, size=None):
+        self.name = name
+        self.kind = kind
+        self.size = size
+
+        # Set if the address of the variable is ever taken.
+        self.addressed = False
+
+    def __repr__(self):
+        return self.name
+
+# The address of a label, such as a function.
+class Sym():
+
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, Sym) and self.name == other.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __repr__(self):
+        return "&{}".format(self.name)
+
+# The operators that work out a value from two operands.
+BINARY = ("add", "sub", "mul", "div", "mod", "shl", "shr", "and", "or", "xor", "mulhu")
+
+# The operators that compare two operands and give 0 or 1.
+COMPARE = ("lt", "gt", "le", "ge", "eq", "ne")
+
+# Operators that can have their operands swapped.
+COMMUTE = ("add", "mul", "and", "or", "xor", "mulhu", "eq", "ne")
+
+# The instructions that end a block.
+TERMINATORS = ("jmp", "br", "ret", "tail")
+
+class Inst():
+
+    __slots__ = ("op", "dst", "args", "targets")
+
+    # dst = op args...
+    #
+    # mov                    dst = a
+    # add sub mul div mod
+    # shl shr and or xor     dst = a op b
+    # mulhu                  dst = the high word of a * b, unsigned
+    # lt gt le ge eq ne      dst = a op b, as 0 or 1
+    # neg not                dst = op a
+    # addr                   dst = the address of variable a
+    # load                   dst = the word a points at, or the word b
+    #                        words after that
+    # store                  the word a points at = b, or the word c
+    #                        words after that = b
+    # call                   dst = a(b, c, ...), where a is a Sym
+    # str                    dst = the address of string a
+    # asm                    the assembly code a
+    # jmp                    go to the first target
+    # br                     go to the first target if a, otherwise the second
+    # ret                    return a, if there is one
+    # tail                   return a(b, c, ...), where a is a Sym, in
+    #                        place of this function
+    def __init__(self, op, dst=None, args=(), targets=()):
+        self.op = op
+        self.dst = dst
+        self.args = list(args)
+        self.targets = list(targets)
+
+    # The variables and registers this instruction reads.
+    def uses(self):
+        if self.op in ("addr", "asm", "str"):
+            return []
+        return [i for i in self.args if isinstance(i, (Temp, Var))]
+
+    # Does this instruction do more than set its destination?
+    def effects(self):
+        return self.op in ("store", "call", "asm", "jmp", "br", "ret", "tail")
+
+    def __repr__(self):
+        if self.op in ("jmp", "br"):
+            s = "{} {}".format(self.op, ", ".join(repr(i) for i in self.args + [Label(i) for i in self.targets]))
+        elif self.op in ("call", "tail"):
+            s = "{} {}({})".format(self.op, self.args[0], ", ".join(repr(i) for i in self.args[1:]))
+        elif self.op == "str":
+            s = "str {}".format(len(self.args[0]))
+        else:
+            s = "{} {}".format(self.op, ", ".join(repr(i) for i in self.args))
+
+        if self.dst is not None:
+            s = "{} = {}".format(self.dst, s)
+
+        return s.strip()
+
+# Shows a block by its name when printing.
+class Label():
+
+    def __init__(self, block):
+        self.block = block
+
+    def __repr__(self):
+        return self.block.name
+
+class Block():
+
+    __slots__ = ("name", "insts")
+
+    def __init__(self, name=""):
+        self.name = name
+        self.insts = []
+
+    # The blocks this block can go to next.
+    def succs(self):
+        if self.insts and self.insts[-1].op in TERMINATORS:
+            return self.insts[-1].targets
+        return []
+
+class Function():
+
+    def __init__(self, name, call, params):
+
+        # The name and calling convention keyword of the function.
+        self.name = name
+        self.call = call
+
+        # The variables of each parameter, in order.
+        self.params = params
+
+        # Every variable the function can use, by name.
+        self.vars = {}
+
+        # The blocks of the function. The first block is the entry.
+        self.blocks = []
+
+        # The number of virtual registers made so far.
+        self.temps = 0
+
+        # Set if the function has assembly code in it.
+        self.asm = False
+
+    # Makes a new virtual register.
+    def temp(self):
+        self.temps += 1
+        return Temp(self.temps)
+
+    # Adds a block to the end of the function.
+    def place(self, b):
+        b.name = "L{}".format(len(self.blocks))
+        self.blocks.append(b)
+
+    # Works out which blocks go to each block.
+    def preds(self):
+        p = {b: [] for b in self.blocks}
+
+        for b in self.blocks:
+            for s in b.succs():
+                p[s].append(b)
+
+        return p
+
+class Module():
+
+    def __init__(self, decls):
+
+        # Every function and prototype of the program, by name.
+        self.decls = decls
+
+        # The functions and the assembly outside of functions, in order.
+        self.text = []
+
+        # The global variables defined in this unit, as syntax tree nodes.
+        self.data = []
+
+        # The global variables used by the unit.
+        self.used = []
+
+        # The instructions licm moved out of loops, by function.
+        self.hoisted = []
+
+    # The functions that have code.
+    def funcs(self):
+        return [i for i in self.text if isinstance(i, Function)]
+
+# Writes out the intermediate code of a module, for debugging.
+def dump(module):
+    outp = []
+
+    for f in module.funcs():
+        outp.append("{}({}):".format(f.name, ", ".join(i.name for i in f.params)))
+
+        for b in f.blocks:
+            outp.append("  {}:".format(b.name))
+            for i in b.insts:
+                outp.append("    {}".format(i))
+
+        outp.append("")
+
+    return "\n".join(outp)
@@ -1,88 +1,131 @@
 """New B lexer."""
 
-import sys, string
+import sys, re
+
+from tokens import *
+
+# The master pattern. Each alternative is a named group and the name of the
+# group that matched decides how the token is handled.
+_token = re.compile(r"""
+    (?P<COMMENT>/\*)
+  | (?P<BLANK>[ \t]+)
+  | (?P<NEWLINE>\n)
+  | (?P<NAME>[A-Za-z_][0-9A-Za-z_.]*(?:@[0-9]*)?)
+  | (?P<HEX>0x[0-9A-Fa-f]*)
+  | (?P<NUMBER>[0-9]+)
+  | (?P<OP><<=|>>=|\+\+|--|<<|>>|<=|>=|==|!=|\^=|\|=|&=|\+=|-=|%=|\*=|/=
+          |[&!~*/%+\-<>^|=?:])
+  | (?P<DELIM>[()\[\]{},;\\])
+  | (?P<ASM>@)
+  | (?P<CHAR>')
+  | (?P<STRING>")
+""", re.VERBOSE)
+
+# Reserved words and the token they are turned into.
+_keywords = {"default": DEFAULT,
+             "stdcall": STDCALL,
+             "repeat": REPEAT,
+             "switch": SWITCH,
+             "return": RETURN,
+             "extrn": EXTRN,
+             "while": WHILE,
+             "break": BREAK,
+             "auto": AUTO,
+             "else": ELSE,
+             "goto": GOTO,
+             "next": NEXT,
+             "case": CASE,
+             "for": FOR,
+             "if": IF,
+             "do": DO}
+
+# Delimiters and the token they are turned into.
+_delims = {"(": SP,
+           ")": EP,
+           "[": SB,
+           "]": EB,
+           "{": SC,
+           "}": EC,
+           ",": COMMA,
+           ";": SEMICOLON,
+           "\\": BSLASH}
+
+# Patterns used to grab whole runs of the input at once.
+_asm = re.compile(r"[^;}\n*]+")
+_str = re.compile(r"[^\"\n*]+")
 
 class Lexer():
 
-    def __init__(self, inp, options):
+    def __init__(self, src, options):
 
         self.line = 1
-        self.char = 1
 
-        self.linp = inp.split("\n")
-        self.inp = inp
+        # Offset of the first character on the current line.
+        self.bol = 0
+
+        # The source is only split into lines if there's an error.
+        self.src = src
+        self.inp = src.text
+
+        # Current offset into the input and the length of the input.
+        self.pos = 0
+        self.end = len(self.inp)
 
         self.outp = []
 
+    # The current column, counted from 1.
+    @property
+    def char(self):
+        return self.pos - self.bol + 1
+
     def peek(self, c=1):
-        return self.inp[:c]
+        return self.inp[self.pos:self.pos+c]
 
     # Move right.
     def move(self, i=1):
-        self.inp = self.inp[i:]
-        self.char += i
+        self.pos += i
 
     # Move down.
     def newline(self, i=1):
         self.line += i
-        self.char = 1
+        self.bol = self.pos
 
     # Skips over a comment.
     def comment(self):
-        self.move(2)
-        found = False
-        while self.inp:
-            if self.peek(2) == "*/":
-                self.move(2)
-                found = True
-                break
-            elif self.peek() == "\n":
-                self.move()
-                self.newline()
-            else:
-                self.move()
+        e = self.inp.find("*/", self.pos+2)
 
-        if found:
-            return
-        else:
-            error(1)
+        if e == -1:
+            self.error(1)
 
-    # Gets the name of a declaration.
-    def name(self):
-        n = ""
-        l = self.line
-        c = self.char
-        test = string.digits+string.ascii_letters+"_@."
+        # Count the lines inside of the comment in one go.
+        n = self.inp.count("\n", self.pos, e)
+        if n:
+            self.line += n
+            self.bol = self.inp.rfind("\n", self.pos, e) + 1
 
-        while self.peek() in test:
-            if self.peek() == "@":
-                test = string.digits
-            n = n+self.peek()
-            self.move()
+        self.pos = e + 2
 
-        self.add("NAME", n, l, c)
+    # Gets the name of a declaration or a keyword.
+    def name(self, m):
+        n = m.group()
 
-    # Gets the name of a declaration.
-    def num(self):
-        n = ""
-        l = self.line
-        c = self.char
+        if n in _keywords:
+            self.add(_keywords[n])
+        else:
+            self.add(NAME, sys.intern(n))
 
-        # Default type is an integer with a base 10.
-        b = 10
-        s = string.digits
+        self.pos = m.end()
 
-        # Check the base for each number.
-        if self.peek(2) == "0x":
-            self.move(2)
-            b = 16
-            s = string.hexdigits
+    # Gets the value of a number constant.
+    def num(self, m, b=10):
+        n = m.group()
 
-        while self.peek() in s:
-            n = n+self.peek()
-            self.move()
+        # Strip the base prefix.
+        if b == 16:
+            n = n[2:]
 
-        self.add("NUMBER", str(int(n, b)), l, c)
+        self.add(NUMBER, sys.intern(str(int(n, b))))
+        self.pos = m.end()
 
     # Turns an escape character into the actual character.
     def esc_char(self, c):
@@ -115,7 +158,7 @@ class Lexer():
         self.move()
         found = False
         s = ""
-        while self.inp:
+        while self.pos < self.end:
             if self.peek() == ";":
                 found = True
                 break
@@ -129,11 +172,12 @@ class Lexer():
                 s += self.esc_char(self.peek(2))
                 self.move(2)
             else:
-                s += self.peek()
-                self.move()
+                m = _asm.match(self.inp, self.pos)
+                s += m.group()
+                self.pos = m.end()
 
         if found:
-            self.add("ASM", s.strip())
+            self.add(ASM, s.strip())
         else:
             self.error(111)
 
@@ -154,11 +198,11 @@ class Lexer():
         c = 0
         b = 0
 
-        while self.inp:
+        while self.pos < self.end:
 
             if self.peek() == "'":
                 self.move()
-                self.add("NUMBER", c)
+                self.add(NUMBER, c)
                 return
 
             elif self.peek() == "\n":
@@ -191,7 +235,7 @@ class Lexer():
         c = 0
         i = 0
 
-        while self.inp:
+        while self.pos < self.end:
 
             if self.peek() == "\"":
                 self.move()
@@ -203,7 +247,7 @@ class Lexer():
 
                 s.append(c)
 
-                self.add("STRING", tuple(s))
+                self.add(STRING, tuple(s))
 
                 return
 
@@ -217,9 +261,17 @@ class Lexer():
                 self.move(2)
 
             else:
-                c += ord(self.peek()) << (i%4)*8
-                i += 1
-                self.move()
+                # Pack the whole run of plain characters at once.
+                m = _str.match(self.inp, self.pos)
+                self.pos = m.end()
+                for ch in m.group():
+                    c += ord(ch) << (i%4)*8
+                    i += 1
+
+                    if not i%4:
+                        s.append(c)
+                        c = 0
+                continue
 
             # Add this character constant to the list.
             if not i%4:
@@ -236,135 +288,75 @@ class Lexer():
         if char == -1:
             char = self.char
 
-        self.outp.append((tn, data, line, char))
+        self.outp.append(Token(tn, data, line, char, self.src))
 
     # Error control.
     def error(self, err_num=0):
-        print(self.linp[self.line-1].replace("\t", " "))
+        print(self.src.line(self.line).replace("\t", " "))
         print((self.char-1)*" "+"^")
-        print("Lexer Error #{} at {}:{}\n".format(err_num, self.line, self.char))
+        print("Lexer Error #{} at {}\n".format(err_num, self.src.pos(self.line, self.char)))
         sys.exit(err_num)
 
-    def lexer(self):
+    # Generates the tokens one at a time as they are lexed.
+    def tokens(self):
 
-        while self.inp:
+        while self.pos < self.end:
 
-            # Handle comments.
-            if self.peek(2) == "/*":
-                self.comment()
+            m = _token.match(self.inp, self.pos)
+
+            # If the input is invalid, throw an error.
+            if m is None:
+                self.error(88)
+
+            group = m.lastgroup
 
             # Handle whitespaces.
-            elif self.peek() in (" ", "\t"):
-                self.move()
+            if group == "BLANK":
+                self.pos = m.end()
 
             # Handle new lines.
-            elif self.peek() == "\n":
+            elif group == "NEWLINE":
                 self.move()
                 self.newline()
 
-            # Handle keywords.
-            elif self.peek(7) in ("default", "stdcall"):
-                self.add(self.peek(7).upper())
-                self.move(7)
-
-            elif self.peek(6) in ("repeat", "switch", "return"):
-                self.add(self.peek(6).upper())
-                self.move(6)
-
-            elif self.peek(5) in ("extrn", "while", "break"):
-                self.add(self.peek(5).upper())
-                self.move(5)
-
-            elif self.peek(4) in ("auto", "else", "goto", "next", "case"):
-                self.add(self.peek(4).upper())
-                self.move(4)
-
-            elif self.peek(3) in ("for"):
-                self.add(self.peek(3).upper())
-                self.move(3)
-
-            elif self.peek(2) in ("if", "do"):
-                self.add(self.peek(2).upper())
-                self.move(2)
+            # Handle keywords and indentifers.
+            elif group == "NAME":
+                self.name(m)
 
             # Handle operators.
-            elif self.peek(3) in ("<<=", ">>="):
-                self.add("OP", self.peek(3))
-                self.move(3)
-
-            elif self.peek(2) in ("++", "--", "<<", ">>", "<=",
-                                  ">=", "==", "^=", "|=", "&=",
-                                  "+=", "-=", "%=", "*=", "/="):
-
-                self.add("OP", self.peek(2))
-                self.move(2)
-
-            elif self.peek() in ("&", "!", "~", "*", "/", "%", "+", "-",
-                                 "<", ">", "^", "|", "=", "?", ":"):
-                self.add("OP", self.peek())
-                self.move()
+            elif group == "OP":
+                self.add(OP, sys.intern(m.group()))
+                self.pos = m.end()
 
             # Handle delimiters.
-            elif self.peek() == "(":
-                self.add("SP", "(")
-                self.move()
-
-            elif self.peek() == ")":
-                self.add("EP", ")")
-                self.move()
-
-            elif self.peek() == "[":
-                self.add("SB", "[")
-                self.move()
-
-            elif self.peek() == "]":
-                self.add("EB", "]")
-                self.move()
-
-            elif self.peek() == "{":
-                self.add("SC", "{")
-                self.move()
-
-            elif self.peek() == "}":
-                self.add("EC", "}")
+            elif group == "DELIM":
+                self.add(_delims[m.group()], m.group())
                 self.move()
 
-            elif self.peek() == ",":
-                self.add("COMMA", ",")
-                self.move()
+            # Handle all number constants.
+            elif group == "NUMBER":
+                self.num(m)
 
-            elif self.peek() == ";":
-                self.add("SEMICOLON", ";")
-                self.move()
+            elif group == "HEX":
+                self.num(m, 16)
 
-            elif self.peek() == "\\":
-                self.add("BSLASH", "\\")
-                self.move()
+            # Handle comments.
+            elif group == "COMMENT":
+                self.comment()
 
             # Handle inline assembly.
-            elif self.peek() == "@":
+            elif group == "ASM":
                 self.asm()
 
             # Handle ASCII character constants.
-            elif self.peek() == "'":
+            elif group == "CHAR":
                 self.mchar()
 
             # Handle string constants.
-            elif self.peek() == "\"":
+            elif group == "STRING":
                 self.mstring()
 
-            # Handle all number constants.
-            elif self.peek() in string.digits:
-                self.num()
-
-            # Handle all indentifers.
-            elif self.peek() in string.ascii_letters+"_":
-                self.name()
-
-            # If the input is invalid, throw an error.
-            else:
-                self.error(88)
-
-        # Return the tokenized output tuple and
-        # the source input's lines in a tuple.
-        return self.outp, self.linp
+            # Hand over the token, if one was made.
+            if self.outp:
+                yield from self.outp
+                self.outp.clear()
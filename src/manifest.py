@@ -0,0 +1,40 @@
+"""B Compiler build manifest."""
+
+import os, json
+
+# Gets the name of the manifest kept next to an output file.
+def path(ob):
+    return "{}.manifest".format(ob)
+
+# Reads the manifest of the last build. Returns an empty manifest if
+# there wasn't a build or the manifest can't be read.
+def load(ob):
+    try:
+        with open(path(ob)) as f:
+            m = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(m, dict):
+        return {}
+
+    return m
+
+# Writes the manifest of this build.
+def save(ob, m):
+    try:
+        with open(path(ob) + ".tmp", "w") as f:
+            json.dump(m, f, indent=1, sort_keys=True)
+        os.replace(path(ob) + ".tmp", path(ob))
+    except OSError:
+        pass
+
+# Gets the size and modification time of a file, or None if it's missing.
+# This is how a build notices that its output was changed or removed.
+def stamp(name):
+    try:
+        s = os.stat(name)
+    except OSError:
+        return None
+
+    return [s.st_size, s.st_mtime_ns]
@@ -0,0 +1,1134 @@
+"""B Compiler optimizer."""
+
+import time
+
+from tokens import *
+from ir import *
+
+# The number of bits in a word.
+def bits(options):
+    return 64 if options["f"] in ("win64", "lin64") else 32
+
+# Works out an instruction whose operands are all numbers, the same way
+# the machine would. Returns None if it can't be done at compile time.
+def fold(op, args, n):
+    mask = (1 << n) - 1
+    a = args[0] & mask
+    b = args[1] & mask if len(args) > 1 else 0
+
+    if op == "mov":
+        r = a
+    elif op == "add":
+        r = a + b
+    elif op == "sub":
+        r = a - b
+    elif op == "mul":
+        r = a * b
+    elif op == "mulhu":
+        r = a * b >> n
+    elif op in ("div", "mod"):
+
+        # Dividing by zero is left for the program to find out.
+        if not b:
+            return None
+        r = a // b if op == "div" else a % b
+    elif op == "shl":
+        r = a << (b & (n - 1))
+    elif op == "shr":
+        r = a >> (b & (n - 1))
+    elif op == "and":
+        r = a & b
+    elif op == "or":
+        r = a | b
+    elif op == "xor":
+        r = a ^ b
+
+    # The relational operators compare unsigned numbers.
+    elif op == "lt":
+        r = int(a < b)
+    elif op == "gt":
+        r = int(a > b)
+    elif op == "le":
+        r = int(a <= b)
+    elif op == "ge":
+        r = int(a >= b)
+    elif op == "eq":
+        r = int(a == b)
+    elif op == "ne":
+        r = int(a != b)
+    elif op == "neg":
+        r = -a
+    elif op == "not":
+        r = int(a == 0)
+    else:
+        return None
+
+    # Keep numbers signed so they read the same as in the source.
+    r &= mask
+    return r - (1 << n) if r >> (n - 1) else r
+
+# Works out instructions where one operand is a number that doesn't
+# change the other. Returns the operand the instruction gives, or None.
+def identity(op, a, b):
+    if op in ("add", "sub", "or", "xor", "shl", "shr") and b == Const(0):
+        return a
+    elif op in ("add", "or", "xor") and a == Const(0):
+        return b
+    elif op in ("mul", "div") and b == Const(1):
+        return a
+    elif op == "mul" and a == Const(1):
+        return b
+    elif op in ("mul", "and") and Const(0) in (a, b):
+        return Const(0)
+    elif op == "mod" and b == Const(1):
+        return Const(0)
+    return None
+
+# The global variables of the unit that always keep the number they
+# start with. Only a unit that has every file that could change its
+# globals can know this, and assembly code could change anything.
+def readonly(module, options):
+    if not options["whole"] or any(isinstance(i, str) for i in module.text):
+        return {}
+
+    known = {i.data: int(i.kids[0].data) for i in module.data if i.op == "global"}
+
+    for fn in module.funcs():
+        if fn.asm:
+            return {}
+
+        for b in fn.blocks:
+            for i in b.insts:
+                if isinstance(i.dst, Var) and i.dst.kind == "extrn":
+                    known.pop(i.dst.name, None)
+                elif i.op == "addr" and i.args[0].kind == "extrn":
+                    known.pop(i.args[0].name, None)
+
+    return known
+
+# Works out expressions on numbers at compile time and replaces variables
+# and temporaries that are known to hold a number with the number.
+def constprop(module, options):
+    n = bits(options)
+    globs = readonly(module, options)
+
+    for fn in module.funcs():
+
+        # Only autos and parameters that nothing else can change are
+        # followed. Assembly code could change any of them.
+        def tracked(o):
+            if isinstance(o, Temp):
+                return True
+            elif isinstance(o, Var):
+                return not fn.asm and not o.addressed and o.size is None and o.kind != "extrn"
+            return False
+
+        # What is known at the start of the function. A name that isn't
+        # in a state hasn't been set yet, and None means it isn't a number.
+        entry = {}
+        for i in fn.params:
+            entry[i] = None
+        for i in fn.vars.values():
+            if i.kind == "extrn" and i.name in globs:
+                entry[i] = globs[i.name]
+
+        # Gets the number an operand holds, if it's known.
+        def value(o, state):
+            if isinstance(o, Const):
+                return o.value
+            elif isinstance(o, Var) and o.kind == "extrn":
+                return state.get(o)
+            elif tracked(o):
+                return state.get(o)
+            return None
+
+        # Changes the state by what an instruction sets. Returns the
+        # number it sets its destination to, if it's known.
+        def step(i, state):
+            if i.dst is None:
+                return None
+
+            r = None
+            if i.op == "mov" or i.op in BINARY or i.op in COMPARE or i.op in ("neg", "not"):
+                args = [value(j, state) for j in i.args]
+
+                if None not in args:
+                    r = fold(i.op, args, n)
+                elif i.op in BINARY:
+                    j = identity(i.op, *[Const(v) if v is not None else o for v, o in zip(args, i.args)])
+                    if j is not None:
+                        r = value(j, state)
+
+            if tracked(i.dst):
+                state[i.dst] = r
+            return r
+
+        # Follow the numbers through the blocks until nothing changes.
+        preds = fn.preds()
+        out = {}
+        changed = True
+
+        while changed:
+            changed = False
+
+            for b in fn.blocks:
+                state = meet([out[p] for p in preds[b] if p in out] + ([entry] if b is fn.blocks[0] else []))
+
+                for i in b.insts:
+                    step(i, state)
+
+                if out.get(b) != state:
+                    out[b] = state
+                    changed = True
+
+        # Put the numbers in and fold the instructions.
+        for b in fn.blocks:
+            state = meet([out[p] for p in preds[b] if p in out] + ([entry] if b is fn.blocks[0] else []))
+
+            for i in b.insts:
+                if i.op not in ("addr", "str", "asm"):
+                    for k, j in enumerate(i.args):
+                        v = value(j, state)
+                        if v is not None and not isinstance(j, Const):
+                            i.args[k] = Const(v)
+
+                r = step(i, state)
+
+                if i.dst is None:
+                    continue
+                elif r is not None:
+                    i.op, i.args = "mov", [Const(r)]
+                elif i.op in BINARY:
+                    j = identity(i.op, *i.args)
+                    if j is not None:
+                        i.op, i.args = "mov", [j]
+
+# Joins the states of the blocks that go to a block. A name keeps its
+# number only if it has the same one in all of them.
+def meet(states):
+    if not states:
+        return {}
+
+    r = dict(states[0])
+
+    for s in states[1:]:
+        for k, v in s.items():
+            if k not in r:
+                r[k] = v
+            elif r[k] != v:
+                r[k] = None
+
+    return r
+
+# Finds the number to multiply by instead of dividing by d, which isn't
+# a power of two. Gives the number, the bits to shift the high word by
+# and whether the number needed more than a word. In that case the
+# shift is done in two steps around adding back the number divided.
+def magic(d, n):
+    for p in range(n, 2*n+1):
+        m = -(-(1 << p) // d)
+
+        if m >> n:
+            break
+        elif m*d - (1 << p) <= 1 << (p - n):
+            return m, p - n, False
+
+    l = (d - 1).bit_length()
+    return ((1 << n) * ((1 << l) - d)) // d + 1, l, True
+
+# Replaces multiplies, divides and remainders by numbers with cheaper
+# instructions. Powers of two become shifts and masks and other divisors
+# are multiplied by their reciprocal.
+def strength(module, options):
+    n = bits(options)
+    mask = (1 << n) - 1
+
+    for fn in module.funcs():
+        for b in fn.blocks:
+            insts = []
+
+            for i in b.insts:
+                if i.op == "mul" and isinstance(i.args[0], Const):
+                    i.args.reverse()
+
+                if i.op not in ("mul", "div", "mod") or not isinstance(i.args[1], Const):
+                    insts.append(i)
+                    continue
+
+                a = i.args[0]
+                d = i.args[1].value & mask
+
+                # Leave dividing by zero for the program to find out.
+                if d < 2:
+                    insts.append(i)
+
+                elif not d & (d - 1):
+                    k = d.bit_length() - 1
+
+                    if i.op == "mul":
+                        insts.append(Inst("shl", i.dst, [a, Const(k)]))
+                    elif i.op == "div":
+                        insts.append(Inst("shr", i.dst, [a, Const(k)]))
+                    else:
+                        insts.append(Inst("and", i.dst, [a, Const(d - 1)]))
+
+                elif i.op == "mul":
+                    insts.append(i)
+
+                # A number this big goes into a at most once.
+                elif d >> (n - 1):
+                    if i.op == "div":
+                        insts.append(Inst("ge", i.dst, [a, Const(i.args[1].value)]))
+                    else:
+                        t = fn.temp()
+                        insts.append(Inst("ge", t, [a, Const(i.args[1].value)]))
+                        u = fn.temp()
+                        insts.append(Inst("mul", u, [t, Const(i.args[1].value)]))
+                        insts.append(Inst("sub", i.dst, [a, u]))
+
+                else:
+                    m, s, add = magic(d, n)
+
+                    # Keep the number signed so it reads the same as in
+                    # the source.
+                    if m >> (n - 1):
+                        m -= 1 << n
+
+                    q = fn.temp() if i.op == "mod" else i.dst
+
+                    t = fn.temp()
+                    insts.append(Inst("mulhu", t, [a, Const(m)]))
+
+                    if add:
+                        u = fn.temp()
+                        insts.append(Inst("sub", u, [a, t]))
+                        v = fn.temp()
+                        insts.append(Inst("shr", v, [u, Const(1)]))
+                        w = fn.temp()
+                        insts.append(Inst("add", w, [v, t]))
+                        t, s = w, s - 1
+
+                    insts.append(Inst("shr", q, [t, Const(s)]) if s else Inst("mov", q, [t]))
+
+                    # a % d is a - a / d * d.
+                    if i.op == "mod":
+                        t = fn.temp()
+                        insts.append(Inst("mul", t, [q, Const(i.args[1].value)]))
+                        insts.append(Inst("sub", i.dst, [a, t]))
+
+            b.insts = insts
+
+# Removes the blocks that can't be reached, skips over blocks that only
+# jump somewhere else and joins blocks that always follow each other.
+def simplify(module, options):
+    for fn in module.funcs():
+
+        # A branch on a number always goes the same way, and a branch
+        # with the same target both ways is just a jump.
+        for b in fn.blocks:
+            i = b.insts[-1] if b.insts else None
+
+            if i is not None and i.op == "br":
+                if isinstance(i.args[0], (Const, Sym)):
+                    t = i.targets[0] if not isinstance(i.args[0], Const) or i.args[0].value else i.targets[1]
+                    b.insts[-1] = Inst("jmp", targets=[t])
+                elif i.targets[0] is i.targets[1]:
+                    b.insts[-1] = Inst("jmp", targets=[i.targets[0]])
+
+        # Go straight to where a block that only jumps would go.
+        for b in fn.blocks:
+            if b.insts:
+                b.insts[-1].targets = [thread(i) for i in b.insts[-1].targets]
+
+        fn.blocks = reachable(fn)
+
+        # Join a block to the block it jumps to, if nothing else goes there.
+        preds = fn.preds()
+
+        for b in fn.blocks:
+            while b.insts and b.insts[-1].op == "jmp":
+                s = b.insts[-1].targets[0]
+
+                if s is b or s is fn.blocks[0] or len(preds[s]) != 1:
+                    break
+
+                b.insts[-1:] = s.insts
+                s.insts = []
+
+                for i in b.succs():
+                    preds[i] = [b if p is s else p for p in preds[i]]
+
+        fn.blocks = reachable(fn)
+
+# Finds where a jump to a block really ends up.
+def thread(b):
+    seen = set()
+
+    while len(b.insts) == 1 and b.insts[0].op == "jmp" and b not in seen:
+        seen.add(b)
+        b = b.insts[0].targets[0]
+
+    return b
+
+# The blocks that can be reached from the entry, in their old order.
+def reachable(fn):
+    seen = {fn.blocks[0]}
+    todo = [fn.blocks[0]]
+
+    while todo:
+        for i in todo.pop().succs():
+            if i not in seen:
+                seen.add(i)
+                todo.append(i)
+
+    return [b for b in fn.blocks if b in seen]
+
+# Removes instructions that only set registers that are never used.
+def dce(module, options):
+    for fn in module.funcs():
+        while True:
+            used = set()
+
+            for b in fn.blocks:
+                for i in b.insts:
+                    used.update(j.n for j in i.uses() if isinstance(j, Temp))
+
+            removed = False
+
+            for b in fn.blocks:
+                keep = []
+
+                for i in b.insts:
+                    if isinstance(i.dst, Temp) and i.dst.n not in used:
+
+                        # A call still has to be made.
+                        if i.effects():
+                            i.dst = None
+                        else:
+                            removed = True
+                            continue
+
+                    keep.append(i)
+
+                b.insts = keep
+
+            if not removed:
+                break
+
+# Puts the code of small functions in place of the calls to them, so no
+# call or frame is needed. Functions are done after the functions they
+# call, so what was put into those comes along.
+def inline(module, options):
+    funcs = {fn.name: fn for fn in module.funcs()}
+    done = set()
+
+    def visit(fn):
+        if fn.name in done:
+            return
+        done.add(fn.name)
+
+        for b in fn.blocks:
+            for i in b.insts:
+                if i.op == "call" and i.args[0].name in funcs:
+                    visit(funcs[i.args[0].name])
+
+        # The blocks put in are looked at too, for what's left after the
+        # call and for calls the function it came from didn't put in.
+        n = 0
+        while n < len(fn.blocks):
+            b = fn.blocks[n]
+
+            for k, i in enumerate(b.insts):
+                g = funcs.get(i.args[0].name) if i.op == "call" else None
+
+                if g is not None and g is not fn and inlinable(g, i, options["inline"]):
+                    fn.blocks[n+1:n+1] = splice(fn, b, k, g)
+                    break
+
+            n += 1
+
+        for n, b in enumerate(fn.blocks):
+            b.name = "L{}".format(n)
+
+    for fn in module.funcs():
+        visit(fn)
+
+# About how many machine instructions an instruction turns into. A call
+# pushes its arguments, calls and cleans up the stack.
+def cost(i):
+    if i.op == "call":
+        return len(i.args) + 1
+    elif i.op == "ret":
+        return 0
+    return 1
+
+# Can function g be put in place of a call to it? A function that makes no
+# calls is put in when it costs at most limit. One that makes calls, such
+# as a wrapper, only when it's no bigger than the call, so the code doesn't
+# grow. Assembly code and vectors need the function's own frame, and the
+# address of a parameter could be used to get at the ones after it.
+def inlinable(g, call, limit):
+    if g.asm or any(v.size is not None or v.kind == "param" and v.addressed for v in g.vars.values()):
+        return False
+
+    size = 0
+    leaf = True
+
+    for b in g.blocks:
+        for i in b.insts:
+            if i.op == "call":
+                if i.args[0].name == g.name:
+                    return False
+                leaf = False
+
+            size += cost(i)
+
+    if not leaf:
+        limit = min(limit, cost(call))
+
+    return size <= limit
+
+# Puts a copy of function g in place of the call at b.insts[k] in fn.
+# Returns the new blocks, which go after b.
+def splice(fn, b, k, g):
+    call = b.insts[k]
+
+    # What comes after the call goes in a block of its own.
+    rest = Block()
+    rest.insts = b.insts[k+1:]
+    b.insts = b.insts[:k]
+
+    # The parameters and autos of g become autos of fn, and each of its
+    # temporaries gets a new one. A global variable of g becomes fn's own
+    # variable for it, so the passes after this see that both are the same.
+    externs = {v.name: v for v in fn.vars.values() if v.kind == "extrn"}
+
+    names = {}
+    for v in g.vars.values():
+        if v.kind == "extrn":
+            if v.name not in externs:
+                externs[v.name] = Var(v.name, "extrn")
+                fn.vars["{}.{}".format(v.name, len(fn.vars))] = externs[v.name]
+            names[v] = externs[v.name]
+        else:
+            names[v] = Var("{}.{}".format(g.name, v.name), "auto")
+            names[v].addressed = v.addressed
+            fn.vars["{}.{}".format(names[v].name, len(fn.vars))] = names[v]
+
+    temps = {}
+    def copy(o):
+        if isinstance(o, Temp):
+            if o not in temps:
+                temps[o] = fn.temp()
+            return temps[o]
+        return names.get(o, o) if isinstance(o, Var) else o
+
+    blocks = {i: Block() for i in g.blocks}
+
+    for old, new in blocks.items():
+        for i in old.insts:
+
+            # A return sets the value of the call and goes on after it.
+            if i.op == "ret":
+                if call.dst is not None:
+                    new.insts.append(Inst("mov", call.dst, [copy(i.args[0])]))
+                new.insts.append(Inst("jmp", targets=[rest]))
+            else:
+                new.insts.append(Inst(i.op, copy(i.dst), [copy(j) for j in i.args], [blocks[j] for j in i.targets]))
+
+    # Set the parameters to the arguments and go into the copy.
+    for p, a in zip(g.params, call.args[1:]):
+        b.insts.append(Inst("mov", names[p], [a]))
+    b.insts.append(Inst("jmp", targets=[blocks[g.blocks[0]]]))
+
+    return [blocks[i] for i in g.blocks] + [rest]
+
+# Turns a call that is the last thing a function does into a jump. A call
+# of the function itself becomes a jump back to its start, and a call of
+# another function reuses the frame, so the stack doesn't grow either way.
+def tailcall(module, options):
+    funcs = {fn.name: fn for fn in module.funcs()}
+
+    # A function whose every way out returns 0. A tail call gives what the
+    # other function returns, and assembly code could return anything.
+    def zero(g):
+        return not g.asm and all(b.insts[-1].op in ("jmp", "br") or b.insts[-1].op == "ret" and b.insts[-1].args[0] == Const(0) for b in g.blocks if b.insts)
+
+    for fn in module.funcs():
+        for b in fn.blocks:
+            if len(b.insts) < 2 or b.insts[-1].op != "ret" or b.insts[-2].op != "call":
+                continue
+
+            call, ret = b.insts[-2:]
+            g = module.decls[call.args[0].name]
+            args = call.args[1:]
+
+            # The call's value has to be what is returned. A function that
+            # always gives 0 is as good as returning 0 after it.
+            if call.dst is None or ret.args[0] != call.dst:
+                if not (ret.args[0] == Const(0) and g.name in funcs and zero(funcs[g.name])):
+                    continue
+
+            # Set the parameters again and go back to the start. The
+            # arguments are all worked out before any parameter changes.
+            if g.name == fn.name and not fn.asm and all(v.size is None for v in fn.vars.values()):
+                temps = [fn.temp() for i in args[:len(fn.params)]]
+
+                b.insts[-2:] = [Inst("mov", t, [a]) for t, a in zip(temps, args)]
+                b.insts += [Inst("mov", p, [t]) for p, t in zip(fn.params, temps)]
+                b.insts.append(Inst("jmp", targets=[fn.blocks[0]]))
+
+            # Any other function can take over the frame when its arguments
+            # fit where this function's parameters are, and it cleans them
+            # up the same way. Nothing in the frame can be pointed at, since
+            # the frame is gone by the time the function runs.
+            elif fn.asm or any(v.size is not None or v.addressed for v in fn.vars.values()):
+                continue
+            elif g.call == fn.call == CDECL and len(args) <= len(fn.params) or g.call == fn.call == STDCALL and len(args) == len(fn.params):
+                b.insts[-2:] = [Inst("tail", args=call.args)]
+
+# Works out the blocks that are on every way from the entry to each of
+# the blocks given.
+def dominators(fn, blocks):
+    preds = fn.preds()
+    dom = {b: set(blocks) for b in blocks}
+    dom[blocks[0]] = {blocks[0]}
+    changed = True
+
+    while changed:
+        changed = False
+
+        for b in blocks[1:]:
+            d = set.intersection(*[dom[p] for p in preds[b] if p in dom]) | {b}
+
+            if d != dom[b]:
+                dom[b] = d
+                changed = True
+
+    return dom
+
+# Finds the loops of a function. A jump back to a block that is on every
+# way to the jump makes a loop, of that block and the blocks that can get
+# to the jump without going through it. Gives the blocks of each loop by
+# the block it starts at.
+def loops(fn):
+    blocks = reachable(fn)
+    dom = dominators(fn, blocks)
+    preds = fn.preds()
+    found = {}
+
+    for b in blocks:
+        for h in b.succs():
+            if h in dom[b]:
+                body = found.setdefault(h, {h})
+                todo = [b]
+
+                while todo:
+                    i = todo.pop()
+                    if i not in body:
+                        body.add(i)
+                        todo.extend(p for p in preds[i] if p in dom)
+
+    return found
+
+# The global variables that can only change by being set by name. Only a
+# unit that has every file knows that nothing takes their address, and
+# assembly code could change anything.
+def unaliased(module, options):
+    if not options["whole"] or any(isinstance(i, str) for i in module.text):
+        return set()
+
+    names = set()
+    taken = set()
+
+    for fn in module.funcs():
+        if fn.asm:
+            return set()
+
+        names.update(v.name for v in fn.vars.values() if v.kind == "extrn")
+
+        for b in fn.blocks:
+            for i in b.insts:
+                if i.op == "addr" and i.args[0].kind == "extrn":
+                    taken.add(i.args[0].name)
+
+    return names - taken
+
+# What the blocks of a loop set, and whether they make calls or stores.
+# A call can change any global variable, and a store can change the ones
+# that have their address taken.
+def changes(blocks):
+    written = set()
+    calls = stores = False
+
+    for b in blocks:
+        for i in b.insts:
+            if i.dst is not None:
+                written.add(i.dst)
+
+            if i.op == "call":
+                calls = True
+            elif i.op == "store":
+                stores = True
+
+    return written, calls, stores
+
+# Does an operand keep its value all the way around a loop, given what
+# the loop changes? safe has the global variables no store can change.
+def unchanged(o, loop, safe):
+    written, calls, stores = loop
+
+    if isinstance(o, (Const, Sym)):
+        return True
+    elif isinstance(o, Var) and o.kind != "extrn" and not o.addressed:
+        return o not in written
+    elif isinstance(o, Var):
+        return o not in written and not calls and (not stores or o.kind == "extrn" and o.name in safe)
+    return o not in written
+
+# The registers the code generator keeps values in.
+REGS = 5
+
+# Moves what is worked out the same way on every time around a loop into
+# a block before the loop, so it's only worked out once. Loops are done
+# inside out, so what comes out of a loop can come out of the loops
+# around it too.
+def licm(module, options):
+    safe = unaliased(module, options)
+
+    for fn in module.funcs():
+
+        # Assembly code could change any variable.
+        if fn.asm:
+            continue
+
+        defs = {}
+        for b in fn.blocks:
+            for i in b.insts:
+                if isinstance(i.dst, Temp):
+                    defs[i.dst] = defs.get(i.dst, 0) + 1
+
+        found = loops(fn)
+
+        for h in sorted(found, key=lambda h: len(found[h])):
+            pre = hoist(module, fn, h, found[h], defs, safe)
+
+            if pre is not None:
+                for g, body in found.items():
+                    if g is not h and h in body:
+                        body.add(pre)
+
+        for n, b in enumerate(fn.blocks):
+            b.name = "L{}".format(n)
+
+# Moves the invariant code of the loop starting at block h out of it.
+# Reads of global variables that don't change in the loop are done once,
+# and so is anything worked out only from numbers and from what doesn't
+# change. Loads through pointers stay, since a loop that is never entered
+# mustn't read them. Gives the new block before the loop, if it's needed.
+def hoist(module, fn, h, body, defs, safe):
+    blocks = [b for b in fn.blocks if b in body]
+    loop = changes(blocks)
+    written = loop[0]
+
+    # Everything moved out is kept in a register all the way around the
+    # loop, next to the variables and the temporaries from before the
+    # loop that it uses. Calls and divides change two of the registers,
+    # and one is left for the loop's own temporaries. Past that, what's
+    # moved out ends up in the frame, which is no faster than working it
+    # out again.
+    kept = set()
+    for b in blocks:
+        for i in b.insts:
+            for j in i.uses() + [i.dst]:
+                if isinstance(j, Var) and j.kind != "extrn" and not j.addressed or isinstance(j, Temp) and j not in written:
+                    kept.add(j)
+
+    room = REGS - len(kept) - 1
+    if any(i.op in ("call", "div", "mod", "mulhu") for b in blocks for i in b.insts):
+        room -= 2
+
+    moved = []
+
+    # The temporaries moved out so far that the loop still uses.
+    def held():
+        used = {j for b in blocks for i in b.insts for j in i.uses()}
+        return len([i for i in moved if i.dst in used])
+
+    def invariant(o):
+        return unchanged(o, loop, safe)
+
+    # Take out the instructions that only use what doesn't change, until
+    # no more can be taken out. These save the most, so they go first.
+    changed = True
+    while changed:
+        changed = False
+
+        for b in blocks:
+            keep = []
+
+            for k, i in enumerate(b.insts):
+                if movable(i, b.insts[k+1:k+2], defs) and all(invariant(j) for j in i.args) and held() < room:
+                    moved.append(i)
+                    written.discard(i.dst)
+                    changed = True
+                else:
+                    keep.append(i)
+
+            b.insts = keep
+
+    # Then read each global variable that doesn't change into a
+    # temporary, instead of from memory every time.
+    names = {}
+    for b in blocks:
+        for i in b.insts:
+            if i.op not in ("addr", "asm", "str"):
+                for j in i.args:
+                    if isinstance(j, Var) and j.kind == "extrn" and j not in names and invariant(j) and held() + len(names) < room:
+                        names[j] = fn.temp()
+                        defs[names[j]] = 1
+                        moved.append(Inst("mov", names[j], [j]))
+
+    for b in blocks:
+        for i in b.insts:
+            if i.op not in ("addr", "asm", "str"):
+                i.args = [names.get(j, j) if isinstance(j, Var) else j for j in i.args]
+
+    if not moved:
+        return None
+
+    for i in moved:
+        module.hoisted.append((fn.name, repr(i)))
+
+    # The block before the loop is gone to from outside of the loop.
+    pre = Block()
+    pre.insts = moved + [Inst("jmp", targets=[h])]
+
+    for b in fn.blocks:
+        if b not in body and h in b.succs():
+            b.insts[-1].targets = [pre if i is h else i for i in b.insts[-1].targets]
+
+    fn.blocks.insert(fn.blocks.index(h), pre)
+    return pre
+
+# Can an instruction be done before the loop it's in? It has to be the
+# only one that sets its temporary and can't stop the program, so dividing
+# is only done by numbers that aren't 0. A compare that decides the branch
+# right after it is left, since it's only a jump on the flags.
+def movable(i, after, defs):
+    if not isinstance(i.dst, Temp) or defs[i.dst] != 1:
+        return False
+    elif i.op in ("div", "mod"):
+        return isinstance(i.args[1], Const) and i.args[1].value != 0
+    elif i.op in COMPARE or i.op == "not":
+        return not (after and after[0].op == "br" and after[0].args[0] == i.dst)
+
+    return i.op in BINARY or i.op == "neg"
+
+# Moves the test of a loop from its top to its bottom. The test is done
+# once before the loop and again at the end of each time around it, so
+# going around only takes the branch back, instead of a jump up to the
+# test and then a branch.
+def rotate(module, options):
+    for fn in module.funcs():
+
+        # The assembly code could have labels that can't be copied.
+        if fn.asm:
+            continue
+
+        preds = fn.preds()
+
+        for h, body in loops(fn).items():
+            test = h.insts[-1] if h.insts else None
+
+            # The test has to go on into the loop or leave it.
+            if test is None or test.op != "br" or h in test.targets:
+                continue
+            elif (test.targets[0] in body) == (test.targets[1] in body):
+                continue
+
+            # Each way back has to jump to the test, and what the test
+            # works out can only be used by it, since it gets new
+            # temporaries each time it's copied.
+            latches = [p for p in preds[h] if p in body]
+            if any(p.insts[-1].op != "jmp" for p in latches):
+                continue
+
+            temps = {i.dst for i in h.insts if isinstance(i.dst, Temp)}
+            if any(j in temps for b in fn.blocks if b is not h for i in b.insts for j in i.uses()):
+                continue
+
+            for p in latches:
+                p.insts[-1:] = copy(fn, h.insts, {}, {})
+
+# Copies instructions with new temporaries for the ones they set. temps
+# has the new temporaries so far and blocks has the blocks to go to
+# instead of others. A temporary that is set in more than one place, such
+# as the value of ?:, gets the same new one in each.
+def copy(fn, insts, temps, blocks):
+    def operand(o):
+        if isinstance(o, Temp) and o in temps:
+            return temps[o]
+        return o
+
+    r = []
+    for i in insts:
+        if isinstance(i.dst, Temp) and i.dst not in temps:
+            temps[i.dst] = fn.temp()
+
+        r.append(Inst(i.op, operand(i.dst), [operand(j) for j in i.args], [blocks.get(j, j) for j in i.targets]))
+
+    return r
+
+# Copies the body of a small loop that counts a variable up by one to a
+# limit that doesn't change, so the test and the branch back are only
+# done every few times around. Before the copies, the limit is checked
+# for room for all of them, and the loop itself is left for what is left
+# over.
+def unroll(module, options):
+    k = options["unroll"]
+    if k < 2:
+        return
+
+    safe = unaliased(module, options)
+
+    for fn in module.funcs():
+        if fn.asm:
+            continue
+
+        found = loops(fn)
+
+        for h, body in found.items():
+
+            # Only the innermost loops are unrolled.
+            if any(g is not h and g in body for g in found):
+                continue
+
+            r = counted(fn, h, body, safe, options)
+            if r is not None and sum(len(b.insts) for b in body) * k <= 64:
+                expand(fn, h, body, k, *r)
+
+        for n, b in enumerate(fn.blocks):
+            b.name = "L{}".format(n)
+
+# Finds out if a loop counts a variable i up to a limit n. It has to be
+# left by one branch at its bottom on i < n or i != n, with the same test
+# on the only way into it. Gives the block with the test, the block
+# before the loop, i and n.
+def counted(fn, h, body, safe, options):
+    preds = fn.preds()
+    latches = [p for p in preds[h] if p in body]
+    entry = [p for p in preds[h] if p not in body]
+
+    if len(latches) != 1 or len(entry) != 1:
+        return None
+
+    latch = latches[0]
+    guard = entry[0]
+
+    # The test is a compare on i and n right before the branch.
+    def test(b):
+        if len(b.insts) < 2 or b.insts[-1].op != "br" or b.insts[-1].targets[0] is not h:
+            return None
+
+        i, br = b.insts[-2:]
+        if i.dst != br.args[0] or i.op not in ("lt", "gt", "ne"):
+            return None
+        return i.op, i.args
+
+    if test(latch) is None or latch.insts[-1].targets[1] in body:
+        return None
+
+    # The compare has to only be used by its branch.
+    t = latch.insts[-2].dst
+    if sum(j == t for b in fn.blocks for i in b.insts for j in i.uses()) != 1:
+        return None
+
+    op, args = test(latch)
+    blocks = [b for b in fn.blocks if b in body]
+    loop = changes(blocks)
+
+    # i is the one that goes up by one, and only by the one add, which
+    # happens every time around. n can't change in the loop.
+    def counter(i):
+        if not isinstance(i, Var) or i.kind == "extrn" or i.addressed:
+            return False
+
+        adds = [(b, j) for b in blocks for j in b.insts if j.dst == i]
+        if len(adds) != 1:
+            return False
+
+        b, j = adds[0]
+        return j.op == "add" and j.args in ([i, Const(1)], [Const(1), i]) and b in dominators(fn, reachable(fn))[latch]
+
+    if op != "gt" and counter(args[0]):
+        i, n = args
+    elif op != "lt" and counter(args[1]):
+        n, i = args
+    else:
+        return None
+
+    if not unchanged(n, loop, safe):
+        return None
+
+    # The test before the loop has to be the same, so the loop is only
+    # gone into when i is below n. constprop could have put in the
+    # number i starts at, or found that the test always passes.
+    g = guard.insts[-1] if guard.insts else None
+    before = test(guard)
+
+    if before is not None and before[0] == op:
+        if not all(x == y or y is i and isinstance(x, Const) for x, y in zip(before[1], args)):
+            return None
+    elif not (g is not None and g.op == "br" and g.targets[0] is h and isinstance(g.args[0], Const) and g.args[0].value):
+        return None
+
+    # A loop that is known to go around only a few times isn't worth the
+    # checks, and i + k has to fit in a word.
+    k = options["unroll"]
+    mask = (1 << bits(options)) - 1
+    start = initial(preds, guard, i)
+
+    if isinstance(n, Const) and n.value & mask > mask - k - 1:
+        return None
+    elif isinstance(n, Const) and start is not None and (n.value - start.value) & mask < 2*k:
+        return None
+
+    return latch, guard, i, n
+
+# The number a variable is set to on the way into block b, if it's set to
+# one in b or in the blocks that are the only way to it.
+def initial(preds, b, v):
+    seen = set()
+
+    while b not in seen:
+        seen.add(b)
+
+        for i in reversed(b.insts):
+            if i.dst is v:
+                return i.args[0] if i.op == "mov" and isinstance(i.args[0], Const) else None
+
+        if len(preds[b]) != 1:
+            return None
+        b = preds[b][0]
+
+    return None
+
+# Puts k copies of the loop starting at h in front of it. The copies go
+# from one to the next without a test, and are done again while there's
+# room for k more times around.
+def expand(fn, h, body, k, latch, guard, i, n):
+    blocks = [b for b in fn.blocks if b in body]
+    blocks.remove(h)
+    blocks.insert(0, h)
+
+    # Is there room for k more times around? i + k can't go past the top
+    # of a word, since n is more than k below it.
+    def room(yes, no):
+        t = fn.temp()
+        u = fn.temp()
+        return [Inst("add", t, [i, Const(k)]),
+                Inst("le", u, [t, n]),
+                Inst("br", args=[u], targets=[yes, no])]
+
+    copies = [{b: Block() for b in blocks} for j in range(k)]
+
+    # What's left over goes through the test before the loop again.
+    rest = Block()
+    rest.insts = copy(fn, latch.insts[-2:], {}, {})
+
+    for j, new in enumerate(copies):
+
+        # Each copy gets its own temporaries, which are made before any
+        # block is copied, since a block can use a temporary that is set
+        # in a block after it.
+        temps = {}
+        for b in blocks:
+            for x in b.insts:
+                if isinstance(x.dst, Temp) and x.dst not in temps:
+                    temps[x.dst] = fn.temp()
+
+        for b in blocks:
+            insts = b.insts[:-2] if b is latch else b.insts
+            new[b].insts = copy(fn, insts, temps, new)
+
+        if j + 1 < k:
+            new[latch].insts.append(Inst("jmp", targets=[copies[j+1][h]]))
+        else:
+            new[latch].insts += room(copies[0][h], rest)
+
+    start = [Block()]
+    start[0].insts = room(copies[0][h], h)
+
+    # An n that isn't a number is checked once before the copies. It has
+    # to be at most -k-1 as an unsigned number, like counted() checks for
+    # a number, so that i + k in room() can't wrap around past the top of
+    # a word, come out small and let the copies go past n. A bigger n only
+    # uses the loop itself.
+    if not isinstance(n, Const):
+        t = fn.temp()
+        start.insert(0, Block())
+        start[0].insts = [Inst("le", t, [n, Const(-k-1)]),
+                          Inst("br", args=[t], targets=[start[1], h])]
+
+    guard.insts[-1].targets = [start[0] if j is h else j for j in guard.insts[-1].targets]
+
+    at = fn.blocks.index(h)
+    fn.blocks[at:at] = start + [new[b] for new in copies for b in blocks] + [rest]
+
+# Every pass in the order it runs, with the lowest -O level it runs at.
+# The passes that move code around or make more of it only run at -O2,
+# and unroll only runs when it's turned on with -funroll.
+PASSES = [("inline",    inline,    2),
+          ("tailcall",  tailcall,  2),
+          ("rotate",    rotate,    2),
+          ("constprop", constprop, 1),
+          ("strength", strength, 1),
+          ("unroll",   unroll,   None),
+          ("licm",     licm,     2),
+          ("simplify", simplify, 1),
+          ("dce",      dce,      1)]
+
+# Shows the instructions licm moved out of loops.
+def hoisted(module, name):
+    print("Loop invariants for '{}':".format(name))
+
+    for fn, i in module.hoisted:
+        print("  {:<14} {}".format(fn, i))
+
+    print()
+
+# Is a pass turned on? -f<name> and -fno-<name> win over the -O level. A
+# pass without a level only runs when it's turned on.
+def enabled(options, name, level):
+    return options["passes"].get(name, level is not None and options["O"] >= level)
+
+class PassManager():
+
+    def __init__(self, options):
+
+        # Save the compiler options and flags.
+        self.options = options
+
+        # How long each pass has taken, in seconds.
+        self.times = {}
+
+    # Runs the turned on passes over the module.
+    def run(self, module):
+        for name, func, level in PASSES:
+            if enabled(self.options, name, level):
+                start = time.perf_counter()
+                func(module, self.options)
+                self.times[name] = self.times.get(name, 0) + time.perf_counter() - start
+
+        return module
+
+    # Shows how long each pass took.
+    def report(self, name):
+        print("Optimization passes for '{}':".format(name))
+
+        for i, func, level in PASSES:
+            if i in self.times:
+                print("  {:<12} {:8.3f} ms".format(i, self.times[i]*1000))
+
+        print()
@@ -0,0 +1,418 @@
+"""B Compiler peephole optimizer."""
+
+import re, functools
+
+# The registers that share each 32-bit and 64-bit register.
+_family = {}
+for i in ("a", "b", "c", "d"):
+    for r in ("e{}x", "r{}x", "{}x", "{}l", "{}h"):
+        _family[r.format(i)] = i
+for i in ("si", "di", "bp", "sp"):
+    for r in ("e{}", "r{}", "{}", "{}l"):
+        _family[r.format(i)] = i
+
+# The commas between operands, but not inside of [].
+_comma = re.compile(r",(?![^\[]*\])")
+
+# A register or any other name in an operand.
+_name = re.compile(r"\b[a-z]+\b")
+
+# The full registers a word can be in.
+_full = ("eax", "ebx", "ecx", "edx", "esi", "edi",
+         "rax", "rbx", "rcx", "rdx", "rsi", "rdi")
+
+# Instructions that only write their first operand.
+_write = ("mov", "movzx", "movsx", "lea")
+
+# Instructions that read and write their first operand.
+_update = ("add", "sub", "and", "or", "xor", "adc", "sbb", "shl", "shr",
+           "sar", "rol", "ror", "neg", "not", "inc", "dec")
+
+# Instructions that change the flags without reading them.
+_flags = ("add", "sub", "and", "or", "xor", "cmp", "test", "neg", "shl",
+          "shr", "sar", "imul", "mul", "div")
+
+# Splits a line into its instruction and its operands. Labels,
+# directives and comments give None. The same lines come up again and
+# again, so each one is only split once.
+@functools.lru_cache(maxsize=4096)
+def parse(line):
+    line = line.strip()
+
+    if not line or line[0] == ";" or line.endswith(":"):
+        return None
+
+    parts = line.split(None, 1)
+    args = tuple(i.strip() for i in _comma.split(parts[1])) if len(parts) > 1 else ()
+    return parts[0], args
+
+# Is this line an instruction?
+def is_inst(line):
+    return parse(line) is not None
+
+# The register families an operand uses.
+@functools.lru_cache(maxsize=4096)
+def regs(o):
+    return frozenset(_family[i] for i in _name.findall(o) if i in _family)
+
+# Works out the register families an instruction reads and writes.
+# Gives None if the instruction isn't known.
+@functools.lru_cache(maxsize=4096)
+def effects(op, args):
+    if op in _write and len(args) == 2:
+        dst, src = args
+
+        # Writing part of a register keeps the rest of it.
+        if dst in _full:
+            return regs(src), regs(dst)
+        return regs(dst) | regs(src), regs(dst) if dst in _family else set()
+
+    elif op == "xor" and len(args) == 2 and args[0] == args[1] and args[0] in _full:
+        return set(), regs(args[0])
+
+    elif op in _update:
+        r = set()
+        for i in args:
+            r |= regs(i)
+        return r, regs(args[0]) if args[0] in _family else set()
+
+    elif op in ("cmp", "test"):
+        return regs(args[0]) | regs(args[1]), set()
+
+    elif op == "imul" and len(args) == 3:
+        return regs(args[1]), regs(args[0])
+
+    elif op == "imul" and len(args) == 2:
+        return regs(args[0]) | regs(args[1]), regs(args[0])
+
+    elif op in ("mul", "div"):
+        return regs(args[0]) | {"a", "d"}, {"a", "d"}
+
+    elif op.startswith("set"):
+        return regs(args[0]), regs(args[0])
+
+    elif op == "push":
+        return regs(args[0]) | {"sp"}, {"sp"}
+
+    elif op == "pop":
+        return {"sp"} | (regs(args[0]) if "[" in args[0] else set()), {"sp"} | (regs(args[0]) if args[0] in _family else set())
+
+    # Functions get their arguments on the stack and can change eax, ecx
+    # and edx.
+    elif op == "call":
+        return regs(args[0]) | {"sp"}, {"a", "c", "d", "sp"}
+
+    return None
+
+# Is a register family written before it's read after line i? Gives
+# False when it can't tell, such as at a label or a jump.
+def dead(lines, i, r):
+    for n in range(i, len(lines)):
+        line = lines[n]
+        inst = parse(line)
+
+        if inst is None:
+            if not line.strip() or line.strip()[0] == ";":
+                continue
+            return False
+
+        e = effects(*inst)
+        if e is None:
+            return False
+        elif r in e[0]:
+            return False
+        elif r in e[1]:
+            return True
+
+    return False
+
+# Are the flags set again before they're read after line i? Functions
+# don't get or give anything in the flags.
+def flags_dead(lines, i):
+    for n in range(i, len(lines)):
+        line = lines[n]
+        inst = parse(line)
+
+        if inst is None:
+            if not line.strip() or line.strip()[0] == ";":
+                continue
+            return False
+        elif inst[0] in _flags or inst[0] in ("call", "ret"):
+            return True
+
+        # A jump to another function is like a call.
+        elif inst[0] == "jmp" and not inst[1][0].startswith("."):
+            return True
+        elif inst[0] in _write or inst[0] in ("push", "pop"):
+            continue
+
+        return False
+
+    return False
+
+# The next instruction or label after line i, skipping blank lines and
+# comments. Gives its index, or None.
+def after(lines, i):
+    for n in range(i+1, len(lines)):
+        s = lines[n].strip()
+        if s and s[0] != ";":
+            return n
+    return None
+
+# mov r, r
+def self_move(lines, i):
+    inst = parse(lines[i])
+
+    if inst and inst[0] == "mov" and inst[1][0] == inst[1][1]:
+        return i, i+1, []
+    return None
+
+# jmp .Ln right before .Ln:
+def jump_next(lines, i):
+    inst = parse(lines[i])
+
+    if inst and inst[0] == "jmp":
+        n = after(lines, i)
+        if n is not None and lines[n].strip() == "{}:".format(inst[1][0]):
+            return i, i+1, []
+    return None
+
+# mov [m], r then mov r2, [m] loads what was just stored.
+def store_load(lines, i):
+    a = parse(lines[i])
+    if not a or a[0] != "mov" or a[1][0][0] != "[" or a[1][1] not in _full:
+        return None
+
+    n = after(lines, i)
+    if n is None:
+        return None
+
+    b = parse(lines[n])
+    if b and b[0] == "mov" and b[1][1] == a[1][0] and b[1][0] in _full:
+        return n, n+1, ["mov {}, {}".format(b[1][0], a[1][1])]
+    return None
+
+# mov r, m then mov m, r stores what was just loaded.
+def load_store(lines, i):
+    a = parse(lines[i])
+    if not a or a[0] != "mov" or a[1][0] not in _full:
+        return None
+
+    n = after(lines, i)
+    if n is None:
+        return None
+
+    b = parse(lines[n])
+    if b and b[0] == "mov" and b[1] == (a[1][1], a[1][0]) and _family[a[1][0]] not in regs(a[1][1]):
+        return n, n+1, []
+    return None
+
+# A register that is set and then set again before it's used.
+def dead_move(lines, i):
+    inst = parse(lines[i])
+
+    if inst and inst[0] in ("mov", "movzx", "lea") and inst[1][0] in _full and dead(lines, i+1, _family[inst[1][0]]):
+        return i, i+1, []
+    return None
+
+# mov r, s then an instruction that only reads r, which isn't used after.
+# The instruction can read s instead.
+def copy_forward(lines, i):
+    a = parse(lines[i])
+    if not a or a[0] != "mov" or a[1][0] not in _full or a[1][1] not in _full:
+        return None
+
+    n = after(lines, i)
+    if n is None:
+        return None
+
+    r, s = a[1]
+    b = parse(lines[n])
+
+    if not b or effects(*b) is None:
+        return None
+
+    # r has to be read as a whole and can't be written.
+    names = _name.findall(lines[n].strip().split(None, 1)[1]) if b[1] else []
+    used = [j for j in names if _family.get(j) == _family[r]]
+
+    if not used or any(j != r for j in used) or _family[r] in effects(*b)[1]:
+        return None
+    elif b[0] in ("mul", "div", "pop") or b[0].startswith("set"):
+        return None
+    elif not dead(lines, n+1, _family[r]):
+        return None
+
+    line = re.sub(r"\b{}\b".format(r), s, lines[n])
+    return i, n+1, lines[i+1:n] + [line]
+
+# mov r, s then instructions that only use r, then mov t, r, where r isn't
+# used after. The instructions can use t instead.
+def rename(lines, i):
+    a = parse(lines[i])
+
+    if not a or a[0] != "mov" or a[1][0] not in _full:
+        return None
+
+    r = a[1][0]
+    n = i
+
+    while True:
+        n = after(lines, n)
+        if n is None:
+            return None
+
+        b = parse(lines[n])
+        if not b or effects(*b) is None:
+            return None
+
+        # The last move.
+        if b[0] == "mov" and b[1][1] == r and b[1][0] in _full:
+            t = b[1][0]
+            break
+
+        elif b[0] in ("mul", "div", "call") or b[0].startswith("set"):
+            return None
+
+        # r is set to something else before it's moved, so the search
+        # stops instead of going on to the end of the block.
+        elif b[0] in _write and b[1][0] in _full and _family[b[1][0]] == _family[r] and _family[r] not in regs(b[1][1]):
+            return None
+
+        # r can only be used as a whole.
+        names = _name.findall(lines[n].strip().split(None, 1)[1]) if b[1] else []
+        if any(j != r for j in names if _family.get(j) == _family[r]):
+            return None
+
+    if not dead(lines, n+1, _family[r]):
+        return None
+
+    # t can't be used in between, since it's set early now.
+    new = []
+    for j in range(i+1, n):
+        if not is_inst(lines[j]):
+            new.append(lines[j])
+        elif _family[t] in regs(lines[j]):
+            return None
+        else:
+            new.append(re.sub(r"\b{}\b".format(r), t, lines[j]))
+
+    return i, n+1, ["mov {}, {}".format(t, a[1][1])] + new
+
+# mov r, s then add r, n is one lea when the flags aren't needed.
+def add_lea(lines, i):
+    a = parse(lines[i])
+    if not a or a[0] != "mov" or a[1][0] not in _full or a[1][1] not in _full:
+        return None
+
+    n = after(lines, i)
+    if n is None:
+        return None
+
+    b = parse(lines[n])
+    if not b or b[0] not in ("add", "sub") or b[1][0] != a[1][0] or not re.fullmatch(r"-?\d+", b[1][1]):
+        return None
+    elif not flags_dead(lines, n+1):
+        return None
+
+    k = int(b[1][1]) if b[0] == "add" else -int(b[1][1])
+    return i, n+1, lines[i+1:n] + ["lea {}, [{}{:+}]".format(a[1][0], a[1][1], k)]
+
+# mov r, 0 is shorter as xor r, r when the flags aren't needed.
+def xor_zero(lines, i):
+    inst = parse(lines[i])
+
+    if inst and inst[0] == "mov" and inst[1][0] in _full and inst[1][1] == "0" and flags_dead(lines, i+1):
+        return i, i+1, ["xor {0}, {0}".format(inst[1][0])]
+    return None
+
+# Every rule, by name. Each one looks at the lines from line i and gives
+# the lines it replaces and what they're replaced with, or None.
+RULES = {"self-move":    self_move,
+         "jump-next":    jump_next,
+         "store-load":   store_load,
+         "load-store":   load_store,
+         "dead-move":    dead_move,
+         "copy-forward": copy_forward,
+         "rename":       rename,
+         "add-lea":      add_lea,
+         "xor-zero":     xor_zero}
+
+class Peephole():
+
+    def __init__(self, rules):
+
+        # The rules to use, by name.
+        self.rules = rules
+
+        # How many times each rule was used.
+        self.hits = {i: 0 for i in rules}
+
+        # The number of instructions before and after the rules were used.
+        self.before = 0
+        self.after = 0
+
+    # Runs the rules over the lines. After a change the rules are tried
+    # again from the instruction before it, since the change can let one
+    # of them match there.
+    #
+    # The lines that are done are moved to a new list, which leaves their
+    # places free. Rules only look at the lines from the one they start at,
+    # so the lines from there to a change and what the change gives are
+    # written at the end of the lines it replaces, instead of splicing the
+    # list, which would move every line after them.
+    def run(self, lines):
+        lines = list(lines)
+        out = []
+        i = 0
+
+        # Where the instructions and labels are in out.
+        marks = []
+
+        while i < len(lines):
+
+            # Every rule starts at an instruction.
+            if not is_inst(lines[i]):
+                line = lines[i].strip()
+                if line and line[0] != ";":
+                    marks.append(len(out))
+
+                out.append(lines[i])
+                i += 1
+                continue
+
+            for name in self.rules:
+                r = RULES[name](lines, i)
+
+                if r is not None:
+                    start, end, new = r
+                    back = start == i
+                    new = lines[i:start] + new
+                    i = max(end - len(new), 0)
+                    lines[i:end] = new
+                    self.hits[name] += 1
+
+                    # Go back to the instruction before the change. The
+                    # rules don't look past a label, so there's no need to
+                    # go back past one.
+                    if back and marks and is_inst(out[marks[-1]]):
+                        n = marks.pop()
+                        i -= len(out) - n
+                        lines[i:i+len(out)-n] = out[n:]
+                        del out[n:]
+                    break
+            else:
+                marks.append(len(out))
+                out.append(lines[i])
+                i += 1
+
+        return out
+
+    # Shows how many times each rule was used.
+    def report(self, name):
+        print("Peephole rules for '{}':".format(name))
+
+        for i in self.rules:
+            print("  {:<14} {:6}".format(i, self.hits[i]))
+
+        print("  {} instructions, {} before\n".format(self.after, self.before))
@@ -0,0 +1,174 @@
+"""B Compiler expression parser."""
+
+import sys
+
+from tokens import *
+from tree import Node
+
+# The binding power of each binary operator and if it's right associative.
+_binary = {"*":   (11, False),
+           "/":   (11, False),
+           "%":   (11, False),
+           "+":   (10, False),
+           "-":   (10, False),
+           "<<":  (9, False),
+           ">>":  (9, False),
+           "<":   (8, False),
+           "<=":  (8, False),
+           ">":   (8, False),
+           ">=":  (8, False),
+           "==":  (7, False),
+           "!=":  (7, False),
+           "&":   (6, False),
+           "^":   (5, False),
+           "|":   (4, False),
+           "?":   (3, True),
+           "=":   (2, True),
+           "+=":  (2, True),
+           "-=":  (2, True),
+           "*=":  (2, True),
+           "/=":  (2, True),
+           "%=":  (2, True),
+           "<<=": (2, True),
+           ">>=": (2, True),
+           "&=":  (2, True),
+           "^=":  (2, True),
+           "|=":  (2, True)}
+
+# Operators that can come before an operand.
+_unary = ("+", "-", "!", "*", "&", "++", "--")
+
+# The binding power of unary operators and of the postfix operators,
+# calls and vector indexes.
+_prefix = 12
+_postfix = 13
+
+class Pratt():
+
+    def __init__(self, inp):
+
+        # The parser's token stream. Tokens are taken off of it as they are
+        # used, so the parser can carry on right after the expression.
+        self.inp = inp
+
+    # The error points at the token t, or the next token if there isn't one.
+    def error(self, err_num=0, t=None):
+        if t is None:
+            if not self.inp:
+                print("Expression Error #{} at the end of the input\n".format(err_num))
+                sys.exit(err_num)
+            t = self.speek()
+
+        print(t.text().replace("\t", " "))
+        print((t.char-1)*" "+"^")
+        print("Expression Error #{} at {}\n".format(err_num, t.pos()))
+        sys.exit(err_num)
+
+    # Peek at a single token in the input list.
+    def speek(self, c=0):
+        return self.inp[c]
+
+    # Discards used tags in the input list.
+    def discard(self, i=1):
+        self.inp.discard(i)
+
+    # Makes sure the next token is a delimiter and discards it.
+    def expect(self, kind, err_num):
+        if not self.inp or self.speek().kind != kind:
+            self.error(err_num)
+        self.discard()
+
+    # Gets how tightly the next token binds to the operand before it.
+    def power(self):
+        if not self.inp:
+            return 0
+
+        t = self.speek()
+
+        if t.kind == OP:
+            if t.data in ("++", "--"):
+                return _postfix
+            elif t.data in _binary:
+                return _binary[t.data][0]
+        elif t.kind in (SP, SB):
+            return _postfix
+
+        return 0
+
+    # Parses an expression. Only operators that bind tighter than rbp are
+    # made part of it.
+    def expr(self, rbp=0):
+        left = self.operand()
+
+        while self.power() > rbp:
+            t = self.speek()
+            self.discard()
+
+            # Postfix increment and decrement.
+            if t.kind == OP and t.data in ("++", "--"):
+                left = Node(t.data, [left], t)
+
+            # Function calls.
+            elif t.kind == SP:
+                args = [left]
+
+                if self.inp and self.speek().kind == EP:
+                    self.discard()
+                else:
+                    while True:
+                        args.append(self.expr(1))
+
+                        if self.inp and self.speek().kind == COMMA:
+                            self.discard()
+                        else:
+                            break
+
+                    self.expect(EP, 23)
+
+                left = Node("call", args, t)
+
+            # Vector indexes.
+            elif t.kind == SB:
+                left = Node("[]", [left, self.expr()], t)
+                self.expect(EB, 28)
+
+            # The conditional operator.
+            elif t.data == "?":
+                a = self.expr()
+
+                if not self.inp or self.speek().data != ":":
+                    self.error(29)
+                self.discard()
+
+                left = Node("?", [left, a, self.expr(_binary["?"][0]-1)], t)
+
+            # Binary operators. Right associative operators let an operator
+            # with the same binding power take the right operand.
+            else:
+                p, right = _binary[t.data]
+                left = Node(t.data, [left, self.expr(p-1 if right else p)], t)
+
+        return left
+
+    # Parses an operand and any unary operators in front of it.
+    def operand(self):
+        if not self.inp:
+            self.error(300)
+
+        t = self.speek()
+        self.discard()
+
+        if t.kind == NAME:
+            return Node("name", tok=t)
+        elif t.kind == NUMBER:
+            return Node("number", tok=t)
+        elif t.kind == STRING:
+            return Node("string", tok=t)
+        elif t.kind == SP:
+            n = self.expr()
+            self.expect(EP, 23)
+            return n
+        elif t.kind == OP and t.data in _unary:
+            return Node("u"+t.data, [self.expr(_prefix)], t)
+
+        self.error(300, t)
@@ -0,0 +1,83 @@
+"""B Compiler program reachability."""
+
+import re, itertools
+
+from lexer import Lexer
+from parse import Parser
+from tree import Func
+
+# A B name in assembly code. Names get a _ in front and stdcall functions
+# also get an @ and the size of their parameters after.
+_sym = re.compile(r"\b_([A-Za-z_][\w.]*)")
+
+# Adds every name a piece of the syntax tree refers to.
+def refs(n, names):
+    if n.op == "name":
+        names.add(n.data)
+    elif n.op == "asm":
+        names.update(_sym.findall(n.data))
+
+    for i in n.kids:
+        refs(i, names)
+
+# Works out what one file defines and what each thing in it refers to.
+# Returns the names it defines, the names of everything it defines or
+# refers to, the names each function refers to, and the names the
+# assembly outside of functions refers to, which are always needed.
+def scan(heads, src, options):
+    tokens = itertools.chain.from_iterable(Lexer(i, options).tokens() for i in heads+[src])
+    prog = Parser(tokens, options).parser()
+
+    defs = set()
+    names = set()
+    edges = {}
+    roots = set()
+
+    for i in prog.items:
+        if isinstance(i, Func):
+            edges[i.name] = set()
+            refs(i.body, edges[i.name])
+
+            defs.add(i.name)
+            names |= edges[i.name]
+        elif i.op == "asm":
+            refs(i, roots)
+            names |= roots
+        else:
+            defs.add(i.data)
+
+    return defs, names | defs, edges, roots
+
+# Finds every function and global variable that can be reached from the
+# roots, by following what each function refers to.
+def live(files, roots):
+    edges = {}
+    todo = list(roots)
+
+    for defs, names, e, r in files:
+        edges.update(e)
+        todo.extend(r)
+
+    seen = set()
+    while todo:
+        n = todo.pop()
+        if n not in seen:
+            seen.add(n)
+            todo.extend(edges.get(n, ()))
+
+    return seen
+
+# Drops the functions and global variables that aren't in keep from a
+# program, before any code is made for them.
+def prune(prog, keep):
+    keep = set(keep)
+    items = []
+
+    for i in prog.items:
+        if isinstance(i, Func):
+            if i.name in keep:
+                items.append(i)
+        elif i.op == "asm" or i.data in keep:
+            items.append(i)
+
+    prog.items = items
@@ -0,0 +1,59 @@
+"""B Compiler source text."""
+
+import array, mmap
+
+class Source():
+
+    def __init__(self, text, name=""):
+
+        self.text = text
+        self.name = name
+
+        # Offsets of the start of each line. Only built once a
+        # diagnostic needs it.
+        self.lines = None
+
+    # Builds the line offsets.
+    def index(self):
+        self.lines = array.array("L", [0])
+        i = self.text.find("\n")
+
+        while i != -1:
+            self.lines.append(i+1)
+            i = self.text.find("\n", i+1)
+
+    # Gets the text of a line, counting from 1.
+    def line(self, n):
+        if self.lines is None:
+            self.index()
+
+        if n < 1 or n > len(self.lines):
+            return ""
+
+        s = self.lines[n-1]
+        e = self.lines[n]-1 if n < len(self.lines) else len(self.text)
+
+        return self.text[s:e]
+
+    # Formats the location of a line and column for a diagnostic.
+    def pos(self, line, char):
+        if self.name:
+            return "{}:{}:{}".format(self.name, line, char)
+        return "{}:{}".format(line, char)
+
+# Reads a source file by mapping it into memory.
+def load(name):
+    with open(name, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                text = str(m, "utf-8")
+
+        # Empty files can't be mapped.
+        except ValueError:
+            text = ""
+
+    # The lexer only knows about \n.
+    if "\r" in text:
+        text = text.replace("\r\n", "\n")
+
+    return Source(text, name)
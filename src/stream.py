@@ -0,0 +1,86 @@
+"""B Compiler token stream."""
+
+class Stream():
+
+    def __init__(self, inp):
+
+        # Where the tokens come from. This can be a list or a generator.
+        self.src = iter(inp)
+
+        # The lookahead buffer and the position of the next token in it.
+        self.buf = []
+        self.pos = 0
+
+        # Set when the source has run out of tokens.
+        self.done = False
+
+        # Caches the index of the next token of a set of kinds.
+        # (kinds) = [index of the next token, index the scan stopped at]
+        self.stops = {}
+
+    # Pulls tokens from the source until there are c of them past the
+    # position. Returns False if the source ran out first.
+    def fill(self, c=1):
+        need = self.pos + c - len(self.buf)
+
+        while need > 0 and not self.done:
+            try:
+                self.buf.append(next(self.src))
+                need -= 1
+            except StopIteration:
+                self.done = True
+
+        return need <= 0
+
+    # Discards used tokens.
+    def discard(self, i=1):
+        if self.pos + i > len(self.buf):
+            self.fill(i)
+        self.pos = min(self.pos + i, len(self.buf))
+
+        # Drop the tokens that were used so the buffer stays small.
+        if self.pos >= 1024:
+            self.compact()
+
+    # Removes every token before the position from the buffer.
+    def compact(self):
+        del self.buf[:self.pos]
+
+        for k, v in self.stops.items():
+            v[0] -= self.pos
+            v[1] -= self.pos
+
+        self.pos = 0
+
+    # Returns the index of the next token with one of the kinds, or -1.
+    # Each token is only looked at once for each set of kinds.
+    def next(self, kinds):
+        i, scan = self.stops.get(kinds, (-1, self.pos))
+
+        if i >= self.pos:
+            return i
+
+        i = max(scan, self.pos)
+        while self.fill(i - self.pos + 1):
+            if self.buf[i].kind in kinds:
+                self.stops[kinds] = [i, i+1]
+                return i
+            i += 1
+
+        self.stops[kinds] = [-1, i]
+        return -1
+
+    # Looks ahead for a tag until the stop tag is found.
+    def find(self, tag, stop):
+        i = self.next((tag, stop))
+        return i != -1 and self.buf[i].kind == tag
+
+    # Gets the token c places ahead of the position.
+    def __getitem__(self, c):
+        if self.pos + c >= len(self.buf):
+            self.fill(c+1)
+        return self.buf[self.pos+c]
+
+    # True while there are tokens left.
+    def __bool__(self):
+        return self.pos < len(self.buf) or self.fill()
@@ -0,0 +1,69 @@
+"""B Compiler tokens."""
+
+# Token kinds.
+NAME = 0
+NUMBER = 1
+STRING = 2
+ASM = 3
+OP = 4
+
+# Delimiters.
+SP = 5
+EP = 6
+SB = 7
+EB = 8
+SC = 9
+EC = 10
+COMMA = 11
+SEMICOLON = 12
+BSLASH = 13
+
+# Keywords.
+DEFAULT = 14
+STDCALL = 15
+CDECL = 16
+REPEAT = 17
+SWITCH = 18
+RETURN = 19
+EXTRN = 20
+WHILE = 21
+BREAK = 22
+AUTO = 23
+ELSE = 24
+GOTO = 25
+NEXT = 26
+CASE = 27
+FOR = 28
+IF = 29
+DO = 30
+
+# The name of each kind, for debugging.
+names = {v: k for k, v in globals().items() if isinstance(v, int)}
+
+class Token():
+
+    __slots__ = ("kind", "data", "line", "char", "src")
+
+    def __init__(self, kind, data="", line=-1, char=-1, src=None):
+        self.kind = kind
+        self.data = data
+        self.line = line
+        self.char = char
+
+        # The source file this token came from.
+        self.src = src
+
+    # Formats where this token is for a diagnostic.
+    def pos(self):
+        if self.src:
+            return self.src.pos(self.line, self.char)
+        return "{}:{}".format(self.line, self.char)
+
+    # Gets the line of source code this token is on.
+    def text(self):
+        if self.src:
+            return self.src.line(self.line)
+        return ""
+
+    def __repr__(self):
+        return "({}, {!r}, {}, {})".format(names[self.kind], self.data, self.line, self.char)
@@ -0,0 +1,104 @@
+"""B Compiler syntax tree."""
+
+class Node():
+
+    __slots__ = ("op", "kids", "tok")
+
+    def __init__(self, op, kids=(), tok=None):
+
+        # What this node does. Leaves are "name", "number" and "string".
+        # Operators use their own text, with a u in front of unary
+        # operators. Calls are "call", vector indexes are "[]" and the
+        # conditional operator is "?".
+        #
+        # Statements are "block", "auto", "extrn", "if", "while", "repeat",
+        # "return", "break", "next", "expr" and "asm". Global variables are
+        # "global" and "vector", and the autos in an "auto" are "var" and
+        # "vector".
+        self.op = op
+
+        # The operands of this node.
+        self.kids = list(kids)
+
+        # The token this node was made from, for its data and diagnostics.
+        self.tok = tok
+
+    # The data of a leaf.
+    @property
+    def data(self):
+        return self.tok.data
+
+    # Is this a name, a number or a string?
+    def leaf(self):
+        return self.op in ("name", "number", "string")
+
+    def __repr__(self):
+        if self.op == "string":
+            return "\"{}\"".format(text(self.data))
+        elif self.leaf():
+            return "{}".format(self.data)
+        elif self.op == "call":
+            return "{}({})".format(self.kids[0], ", ".join(repr(i) for i in self.kids[1:]))
+        elif self.op == "[]":
+            return "{}[{}]".format(*self.kids)
+        elif self.op == "?":
+            return "({} ? {} : {})".format(*self.kids)
+        elif self.op in ("++", "--"):
+            return "({}{})".format(self.kids[0], self.op)
+        elif self.op[0] == "u":
+            return "({}{})".format(self.op[1:], self.kids[0])
+        else:
+            return "({} {} {})".format(self.kids[0], self.op, self.kids[1])
+
+# Unpacks the words of a string constant back into B source text.
+def text(words):
+    s = ""
+
+    for w in words:
+        for i in range(4):
+            c = (w >> i*8) & 0xFF
+
+            if c == 0:
+                return s
+            elif c == 10:
+                s += "*n"
+            elif c == 9:
+                s += "*t"
+            elif c < 32 or c > 126:
+                s += "*?"
+            else:
+                s += chr(c)
+
+    return s
+
+class Func():
+
+    def __init__(self, name, call, params, tok=None):
+
+        # The function's name and calling convention keyword.
+        self.name = name
+        self.call = call
+
+        # The names of the parameters.
+        self.params = params
+
+        # The block of statements, or None if this is a prototype.
+        self.body = None
+
+        # The token of the function's name, for diagnostics.
+        self.tok = tok
+
+    @property
+    def prototype(self):
+        return self.body is None
+
+class Program():
+
+    def __init__(self):
+
+        # The functions, global variables and assembly outside of functions,
+        # in the order they're in the source.
+        self.items = []
+
+        # Every function and prototype by name.
+        self.funcs = {}
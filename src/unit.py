@@ -0,0 +1,63 @@
+"""B Compiler translation units."""
+
+import os, itertools
+
+from lexer import Lexer
+from parse import Parser
+from gen import Gen
+from reach import prune
+from opt import PassManager, hoisted
+from x86 import X86
+from ir import dump
+
+# Compiles a list of sources into an assembly file.
+def build(srcs, name, options):
+
+    # Each file is lexed on its own and the parser pulls each token from
+    # the lexers as it needs it.
+    tokens = itertools.chain.from_iterable(Lexer(i, options).tokens() for i in srcs)
+    prog = Parser(tokens, options).parser()
+
+    # Leave out what the program can't reach.
+    if options["keep"] is not None:
+        prune(prog, options["keep"])
+
+    # Turn the syntax tree into intermediate code, optimize it and then
+    # generate the assembly from it.
+    module = Gen(prog, options).gen()
+    passes = PassManager(options)
+    module = passes.run(module)
+
+    # Save the optimized intermediate code, for debugging.
+    if options["ir"]:
+        with open("{}.ir".format(name), "w") as f:
+            f.write(dump(module))
+
+    x86 = X86(module, options)
+    d = x86.lower()
+
+    if options["time"]:
+        passes.report(name)
+
+    if options["v"] and module.hoisted:
+        hoisted(module, name)
+
+    if options["v"] and x86.peephole:
+        x86.peephole.report(name)
+
+    # Write the assembly code into the out file.
+    with open("{}.asm".format(name), "w") as f:
+        for i in d:
+            f.write(i)
+            f.write("\n")
+
+# Assembles an assembly file into an object file.
+def assemble(name, options):
+    os.system("nasm -f{0} -o{1}.{2} {1}.asm".format(options["asm"], name, options["obj"]))
+
+# Compiles and assembles a list of sources into an object file.
+# This is what each worker runs when compiling in parallel.
+def compile(srcs, name, options):
+    build(srcs, name, options)
+    assemble(name, options)
+    return name
@@ -0,0 +1,893 @@
+"""B Compiler x86 code generator."""
+
+import sys
+
+from tokens import *
+from ir import *
+from opt import enabled
+from peephole import Peephole, RULES, is_inst, regs
+
+# The registers for each word size.
+_regs = {4: {"a": "eax", "b": "ebx", "c": "ecx", "d": "edx",
+             "si": "esi", "di": "edi", "bp": "ebp", "sp": "esp"},
+         8: {"a": "rax", "b": "rbx", "c": "rcx", "d": "rdx",
+             "si": "rsi", "di": "rdi", "bp": "rbp", "sp": "rsp"}}
+
+# The lowest byte of each register, for setcc.
+_low = {"eax": "al", "ebx": "bl", "ecx": "cl", "edx": "dl",
+        "rax": "al", "rbx": "bl", "rcx": "cl", "rdx": "dl"}
+
+# The condition codes of the compare instructions. The relational
+# operators compare unsigned numbers.
+_cc = {"lt": "b", "gt": "a", "le": "be", "ge": "ae", "eq": "e", "ne": "ne"}
+
+# The condition to use when the operands of a compare are swapped.
+_swap = {"lt": "gt", "gt": "lt", "le": "ge", "ge": "le", "eq": "eq", "ne": "ne"}
+
+# The condition code that is true when the other one is false.
+_invert = {"b": "ae", "a": "be", "be": "a", "ae": "b", "e": "ne", "ne": "e"}
+
+class X86():
+
+    def __init__(self, module, options):
+
+        # The intermediate code of the whole program.
+        self.module = module
+
+        # Save the compiler options and flags.
+        self.options = options
+
+        # The output code buffer.
+        self.outp = ["bits 32", ""]
+
+        # Holds a dictionary of segments and their assembly code.
+        self.segments = {".text": [],
+                         ".data": [],
+                         ".bss": []}
+
+        # Size of a word on the machine in 8-bit bytes.
+        if self.options["f"] in ("win32", "lin32"):
+            self.word = 4
+        elif self.options["f"] in ("win64", "lin64"):
+            self.word = 8
+        else:
+            self.error(75)
+
+        self.r = _regs[self.word]
+
+        # The data directive and the size prefix of a word.
+        self.data = "dd" if self.word == 4 else "dq"
+        self.prefix = "dword" if self.word == 4 else "qword"
+
+        # The registers temporaries can be kept in, in the order they're
+        # tried. Register D is kept free for moving things around.
+        self.pool = [self.r["a"], self.r["c"], self.r["b"], self.r["si"], self.r["di"]]
+
+        # The registers a function has to give back the way it found them.
+        self.saved = [self.r["b"], self.r["si"], self.r["di"]]
+
+        # The function being lowered and where its temporaries and
+        # variables are kept.
+        self.fn = None
+        self.loc = {}
+
+        # The callee-saved registers the function saves, and where.
+        self.saves = []
+
+        # The labels of the function's blocks.
+        self.labels = {}
+
+        # The block after the one being lowered.
+        self.next = None
+
+        # The compares that leave their result in the flags for a branch,
+        # and the condition code of the last one.
+        self.fused = set()
+        self.cc = None
+
+        # The words that are loaded, changed and stored back in place. Each
+        # load has the instruction that changes the word, and that
+        # instruction and the store have None.
+        self.folded = {}
+
+        # The label of each string constant, by its words.
+        self.strings = {}
+
+        # The peephole optimizer, if it's turned on.
+        self.peephole = None
+
+    # Handles code generator errors.
+    def error(self, err=0):
+        print("Code Generator Error #{}\n{}\n".format(int(err), err))
+        sys.exit(int(err))
+
+    # Appends the assembly output.
+    def add(self, o="", segment=".text"):
+        self.segments[segment].append(o)
+
+    # Adds an empty line to the output if one doesn't exist already.
+    def add_pretty(self, segment=".text"):
+        if self.segments[segment] and self.segments[segment][-1]:
+            self.add(segment=segment)
+
+    # The name of a function in the assembly.
+    def tname(self, f):
+        if f.call == CDECL:
+            return "_{}".format(f.name)
+        elif f.call == STDCALL:
+            return "_{}@{}".format(f.name, len(f.params)*self.word)
+        else:
+            self.error(130)
+
+    # Generates the assembly of the whole module.
+    def lower(self):
+        for i in self.module.text:
+            if isinstance(i, Function):
+                self.func(i)
+            else:
+                self.add(i)
+
+            self.add_pretty()
+
+        # Clean up the code with the peephole rules that are turned on.
+        if enabled(self.options, "peephole", 1):
+            self.peephole = Peephole([i for i in RULES if enabled(self.options, "peephole-"+i, 0)])
+            self.peephole.before = len([i for i in self.segments[".text"] if is_inst(i)])
+            self.segments[".text"] = self.peephole.run(self.segments[".text"])
+            self.peephole.after = len([i for i in self.segments[".text"] if is_inst(i)])
+
+        names = []
+        for i in self.module.data:
+            names.append(i.data)
+
+            if i.op == "global":
+                self.add("_{}: {} {}".format(i.data, self.data, i.kids[0].data), ".data")
+            else:
+
+                # A vector is a word that points at the words after it.
+                self.add("_{}: {} _{}+{}".format(i.data, self.data, i.data, self.word), ".data")
+                self.add("times {} {} 0".format(i.kids[0].data, self.data), ".data")
+
+        # The strings are packed four characters to a word.
+        for w, n in self.strings.items():
+            self.add("{}: dd {}".format(n, ", ".join(str(i) for i in w)), ".data")
+
+        decls = self.module.decls
+
+        # Names the program never reaches aren't defined anywhere.
+        keep = self.options["keep"]
+        def needed(name):
+            return keep is None or name in keep
+
+        # Add prototyped functions.
+        for i in [i for i in decls.values() if i.prototype and needed(i.name)]:
+            self.outp.append("extern {}".format(self.tname(i)))
+        self.outp.append("")
+
+        # Add global variables that are defined in another file.
+        for i in [i for i in self.module.used if i not in names and i not in decls and needed(i)]:
+            self.outp.append("extern _{}".format(i))
+        self.outp.append("")
+
+        # Make all functions global.
+        for i in self.module.funcs():
+            self.outp.append("global {}".format(self.tname(decls[i.name])))
+        self.outp.append("")
+
+        # Make all global variables global.
+        for i in names:
+            self.outp.append("global _{}".format(i))
+        self.outp.append("")
+
+        # Add all of the segments together.
+        for i in self.segments:
+            self.outp.append("segment {}".format(i))
+            self.outp.append("")
+
+            for n in self.segments[i]:
+                self.outp.append(n)
+
+        return self.outp
+
+    # Is this operand a register?
+    def is_reg(self, o):
+        return o in self.r.values()
+
+    # Is this operand in memory?
+    def is_mem(self, o):
+        return o[0] == "["
+
+    # Gets the assembly operand of a temporary, a variable or a number.
+    def get(self, o):
+        if isinstance(o, Const):
+            return "{}".format(o.value)
+        elif isinstance(o, Sym):
+            return self.tname(self.module.decls[o.name])
+        elif isinstance(o, Var) and o.kind == "extrn":
+            return "[_{}]".format(o.name)
+        return self.loc[o]
+
+    # Adds a space for one or more words to the frame.
+    def slot(self, words=1):
+        self.frame += words*self.word
+        return "[{}-{}]".format(self.r["bp"], self.frame)
+
+    def func(self, f):
+        self.fn = f
+        self.loc = {}
+        self.frame = 0
+
+        # Make space for the words of each vector.
+        autos = [i for i in f.vars.values() if i.kind == "auto"]
+        words = {}
+
+        for i in autos:
+            if i.size:
+                self.slot(i.size)
+                words[i] = self.frame
+
+        # A compare that is only used by the branch right after it leaves
+        # its result in the flags for the branch instead of making a 0 or 1.
+        uses = {}
+        for b in f.blocks:
+            for i in b.insts:
+                for j in i.uses():
+                    uses[j] = uses.get(j, 0) + 1
+
+        self.fused = set()
+        for b in f.blocks:
+            if len(b.insts) > 1:
+                i, j = b.insts[-2:]
+
+                if (i.op in COMPARE or i.op == "not") and j.op == "br" and isinstance(i.dst, Temp) and j.args[0] == i.dst and uses[i.dst] == 1:
+                    self.fused.add(i.dst)
+
+        # A word that is loaded, changed and stored back to the same place
+        # is changed where it is, if nothing else uses what was loaded or
+        # what it was changed to.
+        self.folded = {}
+        for b in f.blocks:
+            for n in range(len(b.insts)-2):
+                i, j, k = b.insts[n:n+3]
+
+                if i.op != "load" or k.op != "store" or [k.args[0]] + k.args[2:] != i.args:
+                    continue
+                elif j.op not in ("add", "sub", "and", "or", "xor", "shl", "shr"):
+                    continue
+                elif j.op in ("shl", "shr") and not isinstance(j.args[1], Const):
+                    continue
+                elif j.args[0] == i.dst and isinstance(j.dst, Temp) and k.args[1] == j.dst and uses[i.dst] == uses[j.dst] == 1:
+                    self.folded[i] = j
+                    self.folded[j] = self.folded[k] = None
+
+        # Variables that nothing else can change can be kept in registers.
+        # Assembly code could use any of them.
+        if f.asm:
+            regvars = set()
+        else:
+            regvars = {i for i in f.params + autos if not i.addressed}
+
+        live = self.alloc(f, regvars)
+
+        # The rest of the parameters stay above the saved BP and IP, and
+        # the rest of the autos get a space in the frame.
+        params = {}
+        for n, i in enumerate(f.params):
+            params[i] = "[{}+{}]".format(self.r["bp"], (n+2)*self.word)
+            if i not in self.loc:
+                self.loc[i] = params[i]
+
+        for i in autos:
+            if i not in self.loc:
+                self.loc[i] = self.slot()
+
+        # Save the registers the function changes. Assembly code could
+        # change any of them.
+        if f.asm:
+            saves = self.saved
+        else:
+            saves = [i for i in self.saved if i in self.loc.values()]
+
+        saves = [(i, self.slot()) for i in saves]
+        self.saves = saves
+
+        self.add("{}:".format(self.tname(f)))
+        self.add("push {}".format(self.r["bp"]))
+        self.add("mov {}, {}".format(self.r["bp"], self.r["sp"]))
+
+        if self.frame:
+            self.add("sub {}, {}".format(self.r["sp"], self.frame))
+
+        for r, s in saves:
+            self.add("mov {}, {}".format(s, r))
+
+        self.add_pretty()
+
+        # Load the parameters that are kept in registers.
+        for i in f.params:
+            if self.is_reg(self.loc[i]):
+                self.add("; {} @ {}".format(i.name, self.loc[i]))
+
+                if i in live:
+                    self.add("mov {}, {}".format(self.loc[i], params[i]))
+
+        # Point each vector at its words. A vector in a register only
+        # needs it if it's used before it's set.
+        for i in autos:
+            self.add("; {} @ {}".format(i.name, self.loc[i]))
+
+            if i.size is None or i in regvars and i not in live:
+                continue
+            elif i.size:
+                if self.is_reg(self.loc[i]):
+                    self.add("lea {}, [{}-{}]".format(self.loc[i], self.r["bp"], words[i]))
+                else:
+                    self.add("lea {}, [{}-{}]".format(self.r["d"], self.r["bp"], words[i]))
+                    self.add("mov {}, {}".format(self.loc[i], self.r["d"]))
+            else:
+                self.op2("mov", self.loc[i], "0")
+
+        self.add_pretty()
+
+        # Only blocks that are jumped to need a label.
+        self.labels = {}
+        for b in f.blocks:
+            for i in b.succs():
+                if i not in self.labels:
+                    self.labels[i] = None
+
+        for n, b in enumerate(f.blocks):
+            if b in self.labels:
+                self.labels[b] = ".L{}".format(n+1)
+
+        for n, b in enumerate(f.blocks):
+            self.next = f.blocks[n+1] if n+1 < len(f.blocks) else None
+
+            if b in self.labels:
+                self.add("{}:".format(self.labels[b]))
+
+            for i in b.insts:
+                self.inst(i)
+
+        self.add(".L0:")
+        self.add_pretty()
+
+        for r, s in saves:
+            self.add("mov {}, {}".format(r, s))
+
+        self.add("mov {}, {}".format(self.r["sp"], self.r["bp"]))
+        self.add("pop {}".format(self.r["bp"]))
+
+        # stdcall functions clean up their own parameters.
+        if f.call == STDCALL and f.params:
+            self.add("ret {}".format(len(f.params)*self.word))
+        else:
+            self.add("ret")
+
+    # Works out where each temporary and each of the variables in regvars
+    # lives, by linear scan over the blocks in order. Each one gets a
+    # register that is free for its whole life. When there isn't one, the
+    # one that is used the least, counting uses in loops more, is put in
+    # the frame instead. Returns what is live at the start of the function.
+    def alloc(self, f, regvars):
+
+        # What a word changed in place is loaded and changed to isn't kept
+        # anywhere.
+        folded = set()
+        for i, j in self.folded.items():
+            if j is not None:
+                folded |= {i.dst, j.dst}
+
+        def wanted(o):
+            return isinstance(o, Temp) and o not in self.fused and o not in folded or o in regvars
+
+        # Number the instructions. Each instruction uses its operands at
+        # 2*n and sets its destination at 2*n+1.
+        pos = {}
+        n = 0
+        for b in f.blocks:
+            pos[b] = n
+            n += len(b.insts)
+
+        # A jump back to an earlier block makes a loop of the blocks in
+        # between. Uses inside of loops count for more.
+        index = {b: n for n, b in enumerate(f.blocks)}
+        depth = {b: 0 for b in f.blocks}
+
+        for b in f.blocks:
+            for s in b.succs():
+                if index[s] <= index[b]:
+                    for i in f.blocks[index[s]:index[b]+1]:
+                        depth[i] += 1
+
+        # What each block needs from the blocks before it.
+        live_in = {b: set() for b in f.blocks}
+        changed = True
+
+        while changed:
+            changed = False
+
+            for b in reversed(f.blocks):
+                live = set()
+                for s in b.succs():
+                    live |= live_in[s]
+
+                for i in reversed(b.insts):
+                    if wanted(i.dst):
+                        live.discard(i.dst)
+                    live.update(j for j in i.uses() if wanted(j))
+
+                if live != live_in[b]:
+                    live_in[b] = live
+                    changed = True
+
+        # The range of numbers each one lives over, how much it's used,
+        # and the registers it can't be in because an instruction changes
+        # them while it's alive.
+        start = {}
+        end = {}
+        avoid = {}
+        weight = {}
+
+        def extend(t, p):
+            if t not in start:
+                start[t] = end[t] = p
+                avoid[t] = set()
+                weight[t] = 0
+            else:
+                start[t] = min(start[t], p)
+                end[t] = max(end[t], p)
+
+        for b in f.blocks:
+            live = set()
+            for s in b.succs():
+                live |= live_in[s]
+
+            first = 2*pos[b]
+            last = 2*(pos[b]+len(b.insts))-1
+
+            for t in live:
+                extend(t, last)
+            for t in live_in[b]:
+                extend(t, first)
+
+            for n, i in reversed(list(enumerate(b.insts))):
+                p = 2*(pos[b]+n)
+
+                if wanted(i.dst):
+                    live.discard(i.dst)
+                    extend(i.dst, p+1)
+                    weight[i.dst] += 10**depth[b]
+
+                clobbers = self.clobbers(i)
+                for t in live:
+                    avoid[t] |= clobbers
+
+                for j in i.uses():
+                    if wanted(j):
+                        live.add(j)
+                        extend(j, p)
+                        weight[j] += 10**depth[b]
+
+                # The divisor can't be where the dividend goes.
+                if i.op in ("div", "mod", "mulhu") and wanted(i.args[1]):
+                    avoid[i.args[1]].add(self.r["a"])
+
+        # Variables that are used before they're set are live from the
+        # start of the function.
+        for t in live_in[f.blocks[0]]:
+            extend(t, 0)
+
+        active = []
+        for t in sorted(start, key=lambda t: start[t]):
+
+            # A variable that is hardly used isn't worth a register.
+            if not isinstance(t, Temp) and weight[t] < 3:
+                continue
+
+            active = [i for i in active if end[i] >= start[t]]
+            taken = {self.loc[i] for i in active}
+
+            for r in self.pool:
+                if r not in taken and r not in avoid[t]:
+                    self.loc[t] = r
+                    active.append(t)
+                    break
+            else:
+
+                # Take the register of something used less, if one can be
+                # used.
+                used = [i for i in active if self.loc[i] not in avoid[t]]
+                spill = min(used, key=lambda i: weight[i], default=None)
+
+                if spill is not None and weight[spill] < weight[t]:
+                    self.loc[t] = self.loc[spill]
+                    active.remove(spill)
+                    active.append(t)
+                else:
+                    spill = t
+
+                # Variables get their usual place later.
+                if isinstance(spill, Temp):
+                    self.loc[spill] = self.slot()
+                else:
+                    self.loc.pop(spill, None)
+
+        return live_in[f.blocks[0]]
+
+    # The registers an instruction changes besides its destination.
+    def clobbers(self, i):
+        if i.op == "call":
+            return {self.r["a"], self.r["c"]}
+        elif i.op in ("div", "mod"):
+            return {self.r["a"], self.r["c"]}
+        elif i.op == "mulhu":
+            return {self.r["a"]}
+        elif i.op in ("shl", "shr") and not isinstance(i.args[1], Const):
+            return {self.r["c"]}
+        elif i.op == "asm":
+            return set(self.pool)
+        return set()
+
+    # Adds an instruction with two operands. Moves the second operand
+    # through register D if both are in memory.
+    def op2(self, op, a, b):
+        if a == b and op == "mov":
+            return
+        elif self.is_mem(a) and self.is_mem(b):
+            self.add("mov {}, {}".format(self.r["d"], b))
+            b = self.r["d"]
+        elif self.is_mem(a) and not self.is_reg(b):
+            a = "{} {}".format(self.prefix, a)
+
+        self.add("{} {}, {}".format(op, a, b))
+
+    # Adds an instruction with one operand.
+    def op1(self, op, a):
+        if not self.is_reg(a):
+            a = "{} {}".format(self.prefix, a)
+        self.add("{} {}".format(op, a))
+
+    # Gets an operand into a register. Uses register D if it isn't in one.
+    def reg(self, o):
+        if self.is_reg(o):
+            return o
+        self.add("mov {}, {}".format(self.r["d"], o))
+        return self.r["d"]
+
+    # Gets the memory operand of the word p points at, or of the word i
+    # words after it. A number of words is added to the displacement, and
+    # the machine scales any other one itself. Register D holds what isn't
+    # in a register, or the whole address if both p and i are in memory.
+    def mem(self, p, i=None):
+        a = self.get(p)
+        if self.is_mem(a):
+            a = None
+
+        if isinstance(i, Const):
+            n = 8*self.word
+            d = i.value*self.word & (1 << n)-1
+            d -= (1 << n) if d >> (n-1) else 0
+
+            # The displacement can only be 32 bits.
+            if -1 << 31 <= d < 1 << 31:
+                a = a or self.reg(self.get(p))
+                return "[{}{:+}]".format(a, d) if d else "[{}]".format(a)
+
+        elif i is None:
+            return "[{}]".format(a or self.reg(self.get(p)))
+
+        x = self.get(i)
+        if a is None and not self.is_reg(x):
+            self.add("mov {}, {}".format(self.r["d"], x))
+            self.add("shl {}, {}".format(self.r["d"], self.word.bit_length()-1))
+            self.add("add {}, {}".format(self.r["d"], self.get(p)))
+            return "[{}]".format(self.r["d"])
+
+        return "[{}+{}*{}]".format(a or self.reg(self.get(p)), self.reg(x), self.word)
+
+    # Changes the word a load points at where it is, by the instruction
+    # i after it.
+    def modify(self, load, i):
+        m = self.mem(*load.args)
+        b = self.get(i.args[1])
+
+        # When register D is part of the address, b goes through another
+        # register for a moment.
+        if self.is_mem(b) and "d" in regs(m):
+            r = [j for j in self.pool if not regs(j) & regs(m)][0]
+            self.add("push {}".format(r))
+            self.add("mov {}, {}".format(r, b))
+            self.add("{} {}, {}".format(i.op, m, r))
+            self.add("pop {}".format(r))
+        else:
+            self.op2(i.op, m, b)
+
+    def inst(self, i):
+        op = i.op
+
+        # The branch after a fused compare tests the flags it left.
+        if op == "br" and i.args[0] in self.fused:
+            self.branch(i, None)
+            return
+
+        # A word changed in place is changed by its load.
+        elif i in self.folded:
+            if self.folded[i] is not None:
+                self.modify(i, self.folded[i])
+            return
+
+        dst = self.get(i.dst) if i.dst is not None and i.dst not in self.fused else None
+        args = [self.get(j) if isinstance(j, (Temp, Var, Const, Sym)) else j for j in i.args]
+
+        if op == "mov":
+            self.op2("mov", dst, args[0])
+
+        elif op in ("add", "sub", "and", "or", "xor", "shl", "shr"):
+            self.binary(op, i, dst, *args)
+
+        elif op == "mul":
+            self.mul(dst, *args)
+
+        elif op in ("div", "mod"):
+            self.div(op, dst, *args)
+
+        elif op == "mulhu":
+            self.mulhu(dst, *args)
+
+        elif op in COMPARE:
+            self.compare(op, dst, *args)
+
+        elif op == "neg":
+            self.op2("mov", dst, args[0])
+            self.op1("neg", dst)
+
+        elif op == "not":
+            self.compare("eq", dst, args[0], "0")
+
+        elif op == "addr":
+            v = i.args[0]
+            if v.kind == "extrn":
+                self.op2("mov", dst, "_{}".format(v.name))
+            elif self.is_reg(dst):
+                self.add("lea {}, {}".format(dst, self.loc[v]))
+            else:
+                self.add("lea {}, {}".format(self.r["d"], self.loc[v]))
+                self.add("mov {}, {}".format(dst, self.r["d"]))
+
+        elif op == "load":
+            p = self.mem(*i.args)
+
+            if self.is_reg(dst):
+                self.add("mov {}, {}".format(dst, p))
+            else:
+                self.add("mov {}, {}".format(self.r["d"], p))
+                self.add("mov {}, {}".format(dst, self.r["d"]))
+
+        elif op == "store":
+            p = self.mem(i.args[0], *i.args[2:])
+            v = args[1]
+
+            # Register D can't hold both the address and the value, so the
+            # value waits on the stack.
+            if self.is_mem(v) and "d" in regs(p):
+                self.op1("push", v)
+                self.op1("pop", p)
+            else:
+                self.op2("mov", p, v)
+
+        elif op == "call":
+            self.call(i, dst, args)
+
+        elif op == "tail":
+            self.tail(i, args)
+
+        elif op == "str":
+
+            # Each different string is only kept once.
+            if i.args[0] not in self.strings:
+                self.strings[i.args[0]] = "str.{}".format(len(self.strings))
+
+            self.op2("mov", dst, self.strings[i.args[0]])
+
+        elif op == "asm":
+            self.add(i.args[0])
+
+        elif op == "jmp":
+            self.jump(i.targets[0])
+
+        elif op == "br":
+            self.branch(i, args[0])
+
+        elif op == "ret":
+            a = args[0]
+            if a == "0":
+                self.add("xor {0}, {0}".format(self.r["a"]))
+            else:
+                self.op2("mov", self.r["a"], a)
+
+            if self.next is not None:
+                self.add("jmp .L0")
+
+        else:
+            # This shouldn't be possible, but just in case.
+            self.error(400)
+
+    # dst = a op b
+    def binary(self, op, i, dst, a, b):
+
+        # Only register C can shift by a number that isn't known.
+        if op in ("shl", "shr") and not isinstance(i.args[1], Const):
+            if dst != self.r["c"] and (dst != b or dst == a):
+                self.op2("mov", dst, a)
+                self.op2("mov", self.r["c"], b)
+                self.add("{} {}, cl".format(op, dst if self.is_reg(dst) else "{} {}".format(self.prefix, dst)))
+            else:
+                self.op2("mov", self.r["d"], a)
+                self.op2("mov", self.r["c"], b)
+                self.add("{} {}, cl".format(op, self.r["d"]))
+                self.op2("mov", dst, self.r["d"])
+
+        elif dst == a:
+            self.op2(op, dst, b)
+
+        elif dst == b and op in COMMUTE:
+            self.op2(op, dst, a)
+
+        elif self.is_reg(dst) and dst != b:
+            self.op2("mov", dst, a)
+            self.op2(op, dst, b)
+
+        else:
+            self.op2("mov", self.r["d"], a)
+            self.op2(op, self.r["d"], b)
+            self.op2("mov", dst, self.r["d"])
+
+    # dst = a * b. The low word is the same signed or unsigned.
+    def mul(self, dst, a, b):
+        r = dst if self.is_reg(dst) else self.r["d"]
+
+        if not self.is_reg(b) and not self.is_mem(b):
+            a, b = b, a
+
+        if not self.is_reg(b) and not self.is_mem(b):
+            self.add("mov {}, {}".format(r, a))
+            self.add("imul {0}, {0}, {1}".format(r, b))
+
+        # 3, 5 and 9 times a register is one lea.
+        elif a in ("3", "5", "9"):
+            if not self.is_reg(b):
+                self.add("mov {}, {}".format(r, b))
+                b = r
+            self.add("lea {}, [{}+{}*{}]".format(r, b, b, int(a)-1))
+        elif not self.is_reg(a) and not self.is_mem(a):
+            self.add("imul {}, {}, {}".format(r, b, a))
+        elif r == b:
+            self.add("imul {}, {}".format(r, a))
+        else:
+            self.op2("mov", r, a)
+            self.add("imul {}, {}".format(r, b))
+
+        self.op2("mov", dst, r)
+
+    # dst = a / b and dst = a % b
+    def div(self, op, dst, a, b):
+        self.op2("mov", self.r["a"], a)
+
+        # Can't divide by a number, so it goes in register C.
+        if not self.is_reg(b) and not self.is_mem(b):
+            self.add("mov {}, {}".format(self.r["c"], b))
+            b = self.r["c"]
+
+        self.add("xor {0}, {0}".format(self.r["d"]))
+        self.op1("div", b)
+
+        # The remainder is left in register D.
+        self.op2("mov", dst, self.r["a"] if op == "div" else self.r["d"])
+
+    # dst = the high word of a * b
+    def mulhu(self, dst, a, b):
+        self.op2("mov", self.r["a"], a)
+
+        if not self.is_reg(b) and not self.is_mem(b):
+            self.add("mov {}, {}".format(self.r["d"], b))
+            b = self.r["d"]
+
+        self.op1("mul", b)
+        self.op2("mov", dst, self.r["d"])
+
+    # Compares a to b and sets the flags.
+    def cmp(self, a, b):
+        if b == "0" and self.is_reg(a):
+            self.add("test {0}, {0}".format(a))
+        elif not self.is_reg(a) and not self.is_mem(a):
+            self.add("mov {}, {}".format(self.r["d"], a))
+            self.add("cmp {}, {}".format(self.r["d"], b))
+        else:
+            self.op2("cmp", a, b)
+
+    # dst = a op b, as 0 or 1.
+    def compare(self, op, dst, a, b):
+
+        # A number has to be the second operand.
+        if not self.is_reg(a) and not self.is_mem(a) and (self.is_reg(b) or self.is_mem(b)):
+            a, b, op = b, a, _swap[op]
+
+        self.cmp(a, b)
+
+        # A fused compare is done once the flags are set.
+        if dst is None:
+            self.cc = _cc[op]
+            return
+
+        r = dst if dst in _low else self.r["d"]
+        self.add("set{} {}".format(_cc[op], _low[r]))
+        self.add("movzx {}, {}".format(r, _low[r]))
+        self.op2("mov", dst, r)
+
+    # Goes to a block, unless it's the next one.
+    def jump(self, b):
+        if b is not self.next:
+            self.add("jmp {}".format(self.labels[b]))
+
+    # Goes to the first target if a isn't 0, otherwise to the second one.
+    # Without a, the flags left by a fused compare decide.
+    def branch(self, i, a):
+        yes, no = i.targets
+
+        if a is None:
+            cc = self.cc
+        elif not self.is_reg(a) and not self.is_mem(a):
+            self.jump(yes if a != "0" else no)
+            return
+        else:
+            self.cmp(a, "0")
+            cc = "ne"
+
+        if no is self.next:
+            self.add("j{} {}".format(cc, self.labels[yes]))
+        else:
+            self.add("j{} {}".format(_invert[cc], self.labels[no]))
+            self.jump(yes)
+
+    # Leaves the function and goes to f(a, b, ...) in its place. The
+    # arguments go where the parameters were and f returns straight to the
+    # caller.
+    def tail(self, i, args):
+        slots = ["[{}+{}]".format(self.r["bp"], (n+2)*self.word) for n in range(len(args)-1)]
+
+        # When an argument is in the place of another parameter that
+        # changes, they all wait on the stack first.
+        changed = [s for s, a in zip(slots, args[1:]) if s != a]
+        if any(a in changed and a != s for s, a in zip(slots, args[1:])):
+            for a in reversed(args[1:]):
+                self.op1("push", a)
+            for s in slots:
+                self.op1("pop", s)
+        else:
+            for s, a in zip(slots, args[1:]):
+                self.op2("mov", s, a)
+
+        for r, s in self.saves:
+            self.add("mov {}, {}".format(r, s))
+
+        self.add("mov {}, {}".format(self.r["sp"], self.r["bp"]))
+        self.add("pop {}".format(self.r["bp"]))
+        self.add("jmp {}".format(args[0]))
+
+    # dst = f(a, b, ...)
+    def call(self, i, dst, args):
+        f = self.module.decls[i.args[0].name]
+
+        # Push the arguments from last to first.
+        for a in reversed(args[1:]):
+            self.op1("push", a)
+
+        self.add("call {}".format(args[0]))
+
+        # Only clean up the stack if needed.
+        if len(args) > 1 and f.call == CDECL:
+            self.add("add {}, {}".format(self.r["sp"], (len(args)-1)*self.word))
+
+        if dst is not None:
+            self.op2("mov", dst, self.r["a"])
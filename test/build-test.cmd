@@ -15,5 +15,21 @@ for %%i in (test*.exe) do (
     del %%i
 )
 
+rem Check that each b test program prints the same thing with the
+rem optimizer on as it does with it off.
+for %%i in (test*.b) do (
+    "../bin/b" -f win32 -O0 -o %%~ni-O0.exe %%i
+    call %%~ni-O0.exe > %%~ni-O0.txt
+
+    for %%o in ("-O1" "-O2" "-O2 -funroll" "-O2 -funroll -funroll-factor=2") do (
+        "../bin/b" -f win32 %%~o -o %%~ni-opt.exe %%i
+        call %%~ni-opt.exe > %%~ni-opt.txt
+        fc /b %%~ni-O0.txt %%~ni-opt.txt > nul && echo %%i %%~o - SAME || echo %%i %%~o - DIFFERENT
+        del %%~ni-opt.exe %%~ni-opt.txt
+    )
+
+    del %%~ni-O0.exe %%~ni-O0.txt
+)
+
 rem Pause so the build information and each program's error code can be viewed.
 pause
@@ -0,0 +1,92 @@
+/* Tail calls. Each line should print the same numbers at every
+   optimization level. */
+
+pr(x) {
+    printn(x, 10);
+    putchar(' ');
+}
+
+nl() {
+    putchar('*n');
+}
+
+/* Calls itself last, so it becomes a loop. */
+sum(n, s) {
+    if (n == 0)
+        return (s);
+    return (sum(n - 1, s + n));
+}
+
+/* The arguments are swapped, so each one has to be worked out before
+   any parameter changes. */
+gcd(a, b) {
+    if (b == 0)
+        return (a);
+    return (gcd(b, a % b));
+}
+
+even(n) {
+    if (n == 0)
+        return (1);
+    return (odd(n - 1));
+}
+
+odd(n) {
+    if (n == 0)
+        return (0);
+    return (even(n - 1));
+}
+
+/* Too big to be put in place of a call to it. */
+h(x) {
+    auto y;
+    y = x * 3;
+    y = y + x * 5;
+    y = y - x * 7;
+    y = y + (x << 2);
+    y = y - (x >> 1);
+    y = y ^ x;
+    y = y + (x & 12);
+    y = y - (x | 1);
+    return (y);
+}
+
+/* Returns what h gives, which isn't always 0. */
+g(x) {
+    auto y;
+    y = x + 1;
+    y = y * 2;
+    y = y - 5;
+    return (h(x + y - y));
+}
+
+/* Ends with a call to g whose value isn't used, so f returns 0. */
+f(x) {
+    pr(x);
+    g(x);
+}
+
+/* Only returns 0, so a call to it can be the last thing done. */
+show(x) {
+    pr(x);
+    return (0);
+}
+
+last(x) {
+    pr(x + 1);
+    show(x);
+}
+
+main() {
+    pr(sum(100, 0)); pr(gcd(1071, 462)); pr(gcd(462, 1071));
+    nl();
+
+    pr(even(10)); pr(odd(10)); pr(even(7)); pr(odd(7));
+    nl();
+
+    pr(f(3));
+    nl();
+
+    pr(last(5));
+    nl();
+}
@@ -0,0 +1,117 @@
+/* Loop-invariant code motion. Each line should print the same numbers
+   at every optimization level. */
+
+g 30;
+k 7;
+v[4];
+
+pr(x) {
+    printn(x, 10);
+    putchar(' ');
+}
+
+nl() {
+    putchar('*n');
+}
+
+incg() {
+    extrn g;
+    g += 1;
+}
+
+main() {
+    extrn g, k, v;
+    auto i, j, s, a, b, p;
+
+    /* Worked out the same way every time around. */
+    a = 5;
+    b = 9;
+    i = 0;
+    s = 0;
+    while (i < 10) {
+        s += a * b + (a << 3) - b / 2;
+        i++;
+    }
+    pr(s);
+    nl();
+
+    /* A global variable that the loop doesn't change. */
+    i = 0;
+    s = 0;
+    while (i < 5) {
+        s += k * 3;
+        i++;
+    }
+    pr(s);
+    nl();
+
+    /* A global variable changed by a call in the loop. */
+    i = 0;
+    s = 0;
+    while (i < 3) {
+        s += g;
+        incg();
+        i++;
+    }
+    pr(s); pr(g);
+    nl();
+
+    /* A global variable changed in the loop. */
+    i = 0;
+    s = 0;
+    while (i < 3) {
+        s += g;
+        g += 2;
+        i++;
+    }
+    pr(s); pr(g);
+    nl();
+
+    /* A global variable changed through a pointer to it. */
+    p = &k;
+    i = 0;
+    s = 0;
+    while (i < 4) {
+        s += k;
+        *p += 1;
+        i++;
+    }
+    pr(s); pr(k);
+    nl();
+
+    /* A vector changed in the loop. */
+    v[0] = 1;
+    i = 0;
+    s = 0;
+    while (i < 4) {
+        s += v[0] * 10;
+        v[0] += i;
+        i++;
+    }
+    pr(s); pr(v[0]);
+    nl();
+
+    /* Nested loops, where the inner one's invariants come out of both. */
+    i = 0;
+    s = 0;
+    while (i < 3) {
+        j = 0;
+        while (j < 4) {
+            s += a * b + i * k;
+            j++;
+        }
+        i++;
+    }
+    pr(s);
+    nl();
+
+    /* A loop that is never entered. */
+    i = 10;
+    s = 0;
+    while (i < 3) {
+        s += g / a;
+        i++;
+    }
+    pr(s);
+    nl();
+}
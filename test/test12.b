@@ -0,0 +1,115 @@
+/* Loop unrolling. Each line should print the same numbers at every
+   optimization level, and with -funroll at each -funroll-factor. */
+
+pr(x) {
+    printn(x, 10);
+    putchar(' ');
+}
+
+nl() {
+    putchar('*n');
+}
+
+/* The loops have a limit that isn't known, and are too big to be put in
+   place of the calls to them. */
+
+/* ?: sets the same value in both of its ways. */
+pick(n) {
+    auto i, s;
+
+    i = 0;
+    s = 0;
+    while (i < n) {
+        s += (i & 1) ? 100 : 1;
+        i++;
+    }
+    return (s);
+}
+
+/* if and else. */
+split(n) {
+    auto i, a, b;
+
+    i = 0;
+    a = 0;
+    b = 0;
+    while (i < n) {
+        if (i % 3 == 0)
+            a += i;
+        else
+            b += 1;
+        i++;
+    }
+    return (a * 1000 + b);
+}
+
+/* A test that stops at the first part that decides it, as nested ifs. */
+both(n) {
+    auto i, s;
+
+    i = 0;
+    s = 0;
+    while (i < n) {
+        if (i > 2)
+            if (i < 9)
+                s += 10;
+        i++;
+    }
+    return (s);
+}
+
+/* Nested ?:. */
+nest(n) {
+    auto i, s;
+
+    i = 0;
+    s = 0;
+    while (i < n) {
+        s += i > 4 ? (i & 1 ? 7 : 1) : 0;
+        i++;
+    }
+    return (s);
+}
+
+/* Counts from i to n, which can be near the top of a word. It shows
+   the count itself so that it's too big to be put in place of the calls
+   to it, where n would be a number. */
+span(i, n) {
+    auto c;
+
+    c = 0;
+    while (i < n) {
+        c += 2;
+        i++;
+    }
+    pr(c);
+}
+
+main() {
+    auto i, s;
+
+    pr(pick(8)); pr(pick(7)); pr(pick(1)); pr(pick(0)); pr(pick(33));
+    nl();
+
+    pr(split(10)); pr(split(3)); pr(split(17));
+    nl();
+
+    pr(both(12)); pr(both(6)); pr(both(2));
+    pr(nest(12)); pr(nest(6)); pr(nest(2));
+    nl();
+
+    /* -1 is the top of a word, since the compares are unsigned. */
+    span(0, 9); span(-10, -3); span(-10, -1); span(-4, -2); span(-20, -5);
+    span(-1, -1); span(5, 3); span(-3, -1); span(-7, -1);
+    nl();
+
+    /* A limit that is a number. */
+    i = 0;
+    s = 0;
+    while (i < 21) {
+        s += i ? i : 50;
+        i++;
+    }
+    pr(s);
+    nl();
+}
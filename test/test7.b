@@ -0,0 +1,65 @@
+/* Constant folding and propagation. Each line should print the same
+   numbers at every optimization level. */
+
+limit 40;
+step 3;
+
+pr(x) {
+    printn(x, 10);
+    putchar(' ');
+}
+
+nl() {
+    putchar('*n');
+}
+
+twice(x) {
+    return (x + x);
+}
+
+main() {
+    extrn limit, step;
+    auto a, b, c, i, s;
+
+    /* Numbers worked out at compile time. */
+    pr(2 + 3 * 4); pr((2 + 3) * 4); pr(100 / 7); pr(100 % 7);
+    pr(1 << 10); pr(1024 >> 3); pr(12 & 10); pr(12 | 3); pr(12 ^ 10);
+    nl();
+
+    /* The relational operators and division are unsigned. */
+    pr(-1 > 1); pr(-1 < 1); pr(-2 >= 5); pr(3 <= 3); pr(4 == 4); pr(4 != 4);
+    pr(-8 / 2 > 1000); pr(-1 % 10); pr(!0); pr(!7); pr(-(-5));
+    nl();
+
+    /* Numbers kept in autos, through branches. */
+    a = 6;
+    b = a * 7;
+    if (b == 42)
+        c = b - 2;
+    else
+        c = 0;
+    pr(a); pr(b); pr(c); pr(c / a); pr(twice(c));
+    nl();
+
+    /* An auto that only has a known number on one way in. */
+    a = 1;
+    if (limit > 20)
+        a = 2;
+    pr(a * 10);
+    nl();
+
+    /* A loop on global variables that never change. */
+    s = 0;
+    i = 0;
+    while (i < limit) {
+        s += i * step + 1;
+        i += step;
+    }
+    pr(s); pr(i);
+    nl();
+
+    /* Words wrap around. */
+    a = 2147483647;
+    pr(a + 1 < a); pr((a + a + 2) == 0);
+    nl();
+}
@@ -0,0 +1,41 @@
+/* Strength reduction of multiplies, divides and remainders by numbers.
+   Each line should print the same numbers at every optimization level. */
+
+pr(x) {
+    printn(x, 10);
+    putchar(' ');
+}
+
+nl() {
+    putchar('*n');
+}
+
+main() {
+    auto v[8], i, x;
+
+    v[0] = 0; v[1] = 1; v[2] = 7; v[3] = 100;
+    v[4] = 12345; v[5] = 65536; v[6] = 2147483647; v[7] = -1;
+
+    i = 0;
+    while (i < 8) {
+        x = v[i];
+
+        /* Powers of two become shifts and masks. */
+        pr(x * 8); pr(x / 4); pr(x % 16);
+
+        /* 3, 5 and 9 are one lea, other numbers a multiply. */
+        pr(x * 3); pr(x * 5); pr(x * 9); pr(x * 10); pr(x * -1);
+
+        /* Other divisors are multiplied by their reciprocal. */
+        pr(x / 3); pr(x % 3); pr(x / 7); pr(x % 7); pr(x / 10); pr(x % 10);
+        pr(x / 641); pr(x % 1000);
+
+        /* Divisors with the top bit set go in at most once. */
+        pr(x / -2); pr(x % -2);
+
+        /* Dividing by 1 is a no-op. */
+        pr(x / 1); pr(x % 1);
+        nl();
+        i++;
+    }
+}
@@ -0,0 +1,84 @@
+/* Inlining. Each line should print the same numbers at every
+   optimization level. */
+
+g 30;
+count 0;
+
+pr(x) {
+    printn(x, 10);
+    putchar(' ');
+}
+
+nl() {
+    putchar('*n');
+}
+
+add(a, b) {
+    return (a + b);
+}
+
+/* Changes its parameter, which mustn't change the caller's auto. */
+dec(n) {
+    n -= 1;
+    return (n * 2);
+}
+
+/* More than one way out. */
+clamp(x) {
+    if (x > 100)
+        return (100);
+    if (x < 10)
+        return (10);
+    return (x);
+}
+
+/* Only changes a global variable. */
+incg() {
+    extrn g;
+    g += 1;
+}
+
+bump() {
+    extrn count;
+    count++;
+}
+
+/* A wrapper, which is no bigger than the call to it. */
+wrap(x) {
+    return (add(x, 1));
+}
+
+main() {
+    extrn g, count;
+    auto i, s, n;
+
+    pr(add(2, 3)); pr(add(add(1, 2), add(3, 4))); pr(wrap(41));
+    nl();
+
+    n = 5;
+    pr(dec(n)); pr(n);
+    nl();
+
+    pr(clamp(5)); pr(clamp(50)); pr(clamp(500));
+    nl();
+
+    /* The global variable read in the loop is changed by the call. */
+    i = 0;
+    s = 0;
+    while (i < 3) {
+        s += g;
+        incg();
+        i++;
+    }
+    pr(s); pr(g);
+    nl();
+
+    /* A call whose value isn't used. */
+    i = 0;
+    while (i < 10) {
+        bump();
+        i++;
+    }
+    pr(count);
+    nl();
+}